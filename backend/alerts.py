@@ -0,0 +1,365 @@
+"""
+Outbreak Alerts - AgriShield AI
+Incremental outbreak detection and push fan-out to subscribers
+
+After each committed sync batch, only the GPS grids touched by the batch
+are re-evaluated against the stored outbreak state. Changes are published
+as outbreak.started / outbreak.escalated / outbreak.resolved events.
+
+Brokers (ALERT_BROKER):
+- memory: in-process fan-out (single worker)
+- file: shared append-only spool file tailed by every worker
+  (local stand-in for a pub/sub broker in multi-worker deployments),
+  rotated to ALERT_SPOOL_PATH.1 once it exceeds ALERT_SPOOL_MAX_BYTES
+"""
+
+import asyncio
+import json
+import os
+from datetime import datetime, timezone
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models import Scan, ActiveOutbreak
+
+OUTBREAK_THRESHOLD = 0.3  # 30% prevalence within a grid
+
+SEVERITY_RANK = {"medium": 1, "high": 2, "critical": 3}
+
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+def outbreak_severity(prevalence):
+    """
+    Severity level for an outbreak prevalence
+    """
+    return "critical" if prevalence >= 0.7 else "high" if prevalence >= 0.5 else "medium"
+
+
+class Subscription:
+    """
+    Subscriber queue with optional per-grid / per-disease filters
+    """
+
+    def __init__(self, gps_grids=None, diseases=None):
+        self.gps_grids = set(gps_grids) if gps_grids else None
+        self.diseases = set(diseases) if diseases else None
+        self.queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def matches(self, event):
+        if self.gps_grids is not None and event["gps_grid"] not in self.gps_grids:
+            return False
+        if self.diseases is not None and event["disease"] not in self.diseases:
+            return False
+        return True
+
+    def deliver(self, event):
+        if not self.matches(event):
+            return
+        if self.queue.full():
+            # Slow consumer: drop the oldest event rather than block ingest
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+
+class MemoryBroker:
+    """
+    In-process fan-out to subscribers of this worker
+    """
+
+    def __init__(self):
+        self.subscriptions = set()
+
+    def subscribe(self, gps_grids=None, diseases=None):
+        subscription = Subscription(gps_grids, diseases)
+        self.subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        self.subscriptions.discard(subscription)
+
+    def publish(self, events):
+        for event in events:
+            self._fan_out(event)
+
+    def _fan_out(self, event):
+        for subscription in list(self.subscriptions):
+            subscription.deliver(event)
+
+
+class FileBroker(MemoryBroker):
+    """
+    Multi-worker fan-out through a shared JSON-lines spool file
+    Every worker appends published events and tails the file for new ones.
+    The publisher that pushes the spool past max_bytes renames it to
+    path + ".1"; tailers notice the new file by its inode and follow it
+    (max_bytes must hold more than one poll interval's worth of events).
+    """
+
+    def __init__(self, path, poll_interval=0.5, max_bytes=None):
+        super().__init__()
+        self.path = path
+        self.poll_interval = poll_interval
+        self.max_bytes = max_bytes
+        self._tail_task = None
+
+    def subscribe(self, gps_grids=None, diseases=None):
+        if self._tail_task is None or self._tail_task.done():
+            self._tail_task = asyncio.get_running_loop().create_task(self._tail())
+        return super().subscribe(gps_grids, diseases)
+
+    def publish(self, events):
+        if not events:
+            return
+        lines = "".join(json.dumps(event) + "\n" for event in events)
+        # O_APPEND keeps concurrent single-write appends from interleaving
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, lines.encode("utf-8"))
+            if self.max_bytes and os.fstat(fd).st_size > self.max_bytes:
+                self._rotate(fd)
+        finally:
+            os.close(fd)
+
+    def _rotate(self, fd):
+        """
+        Move the spool aside, unless another worker already has
+        """
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)  # Released when fd is closed
+        try:
+            if os.stat(self.path).st_ino == os.fstat(fd).st_ino:
+                os.replace(self.path, self.path + ".1")
+        except OSError:
+            pass  # Rotated by another worker, or still open elsewhere (Windows)
+
+    def _open_spool(self, at_end=False):
+        try:
+            spool = open(self.path, "rb")
+        except FileNotFoundError:
+            return None
+        if at_end:
+            spool.seek(0, os.SEEK_END)
+        return spool
+
+    def _rotated(self, spool):
+        try:
+            return os.stat(self.path).st_ino != os.fstat(spool.fileno()).st_ino
+        except FileNotFoundError:
+            return True
+
+    def _drain(self, spool):
+        chunk = spool.read()
+        complete = chunk[:chunk.rfind(b"\n") + 1]
+        # Leave a partially written line for the next read
+        spool.seek(len(complete) - len(chunk), os.SEEK_CUR)
+        for line in complete.splitlines():
+            if line.strip():
+                self._fan_out(json.loads(line))
+
+    async def _tail(self):
+        spool = self._open_spool(at_end=True)
+        try:
+            while self.subscriptions:
+                await asyncio.sleep(self.poll_interval)
+                if spool is None:
+                    spool = self._open_spool()
+                    if spool is None:
+                        continue
+                self._drain(spool)
+                if self._rotated(spool):
+                    # Events appended just before the rename, then the new file
+                    self._drain(spool)
+                    spool.close()
+                    spool = self._open_spool()
+        finally:
+            if spool is not None:
+                spool.close()
+
+
+def create_broker():
+    """
+    Broker selected by the ALERT_BROKER environment variable
+    """
+    kind = os.getenv("ALERT_BROKER", "memory")
+    if kind == "file":
+        return FileBroker(
+            os.getenv("ALERT_SPOOL_PATH", "outbreak_alerts.jsonl"),
+            max_bytes=int(os.getenv("ALERT_SPOOL_MAX_BYTES", str(10 * 1024 * 1024)))
+        )
+    if kind == "memory":
+        return MemoryBroker()
+    raise ValueError(f"Unknown ALERT_BROKER: {kind}")
+
+
+def _event(event_type, gps_grid, disease, severity, previous_severity, prevalence, count, total_scans):
+    return {
+        "type": event_type,
+        "gps_grid": gps_grid,
+        "disease": disease,
+        "severity": severity,
+        "previous_severity": previous_severity,
+        "prevalence": round(prevalence, 3),
+        "percentage": round(prevalence * 100, 1),
+        "count": count,
+        "total_scans": total_scans,
+        "timestamp": datetime.now(timezone.utc).isoformat()
+    }
+
+
+def _disease_counts(db: Session, gps_grids=None):
+    """
+    (gps_grid, disease, count) rows, optionally restricted to gps_grids
+    """
+    query = db.query(Scan.gps_grid, Scan.disease, func.count(Scan.id))
+    if gps_grids is None:
+        query = query.filter(Scan.gps_grid.isnot(None))
+    else:
+        query = query.filter(Scan.gps_grid.in_(gps_grids))
+    return query.group_by(Scan.gps_grid, Scan.disease).all()
+
+
+def _outbreaks(rows, threshold):
+    """
+    Scan totals per grid, and {(gps_grid, disease): (prevalence, count, total)}
+    for diseases at or above threshold
+    """
+    totals = {}
+    for grid, _, count in rows:
+        totals[grid] = totals.get(grid, 0) + count
+
+    current = {}
+    for grid, disease, count in rows:
+        prevalence = count / totals[grid]
+        if prevalence >= threshold:
+            current[(grid, disease)] = (prevalence, count, totals[grid])
+    return totals, current
+
+
+def seed_outbreaks(db: Session, threshold=OUTBREAK_THRESHOLD):
+    """
+    Record outbreaks already present in the scans table without publishing,
+    so the first sync after a deploy does not report them as started
+    Returns the number of outbreaks recorded
+    """
+    _, current = _outbreaks(_disease_counts(db), threshold)
+    existing = set(db.query(ActiveOutbreak.gps_grid, ActiveOutbreak.disease))
+
+    seeded = 0
+    for (grid, disease), (prevalence, count, total_scans) in current.items():
+        if (grid, disease) in existing:
+            continue
+        db.add(ActiveOutbreak(
+            gps_grid=grid,
+            disease=disease,
+            severity=outbreak_severity(prevalence),
+            prevalence=prevalence,
+            count=count,
+            total_scans=total_scans
+        ))
+        seeded += 1
+
+    db.commit()
+    return seeded
+
+
+class OutbreakDetector:
+    """
+    Re-evaluates outbreaks for touched grids and publishes changes
+    """
+
+    def __init__(self, broker, threshold=OUTBREAK_THRESHOLD):
+        self.broker = broker
+        self.threshold = threshold
+
+    def evaluate(self, db: Session, gps_grids):
+        """
+        Diff current outbreaks in gps_grids against stored state,
+        persist the new state and publish the resulting events
+        """
+        gps_grids = {grid for grid in gps_grids if grid}
+        if not gps_grids:
+            return []
+
+        try:
+            events = self._diff(db, gps_grids)
+            db.commit()
+        except IntegrityError:
+            # A concurrent batch inserted the same new outbreak first; diff
+            # again against its committed row instead of duplicating events
+            db.rollback()
+            events = self._diff(db, gps_grids)
+            db.commit()
+
+        self.broker.publish(events)
+        return events
+
+    def _diff(self, db: Session, gps_grids):
+        """
+        Stage state changes for gps_grids and return their events (uncommitted)
+        """
+        rows = _disease_counts(db, gps_grids)
+        totals, current = _outbreaks(rows, self.threshold)
+
+        previous = {
+            (outbreak.gps_grid, outbreak.disease): outbreak
+            for outbreak in db.query(ActiveOutbreak).filter(
+                ActiveOutbreak.gps_grid.in_(gps_grids)
+            ).with_for_update()
+        }
+
+        events = []
+
+        for key, (prevalence, count, total_scans) in current.items():
+            grid, disease = key
+            severity = outbreak_severity(prevalence)
+            state = previous.get(key)
+
+            if state is None:
+                db.add(ActiveOutbreak(
+                    gps_grid=grid,
+                    disease=disease,
+                    severity=severity,
+                    prevalence=prevalence,
+                    count=count,
+                    total_scans=total_scans
+                ))
+                events.append(_event(
+                    "outbreak.started", grid, disease, severity, None, prevalence, count, total_scans
+                ))
+                continue
+
+            if SEVERITY_RANK[severity] > SEVERITY_RANK[state.severity]:
+                events.append(_event(
+                    "outbreak.escalated", grid, disease, severity, state.severity,
+                    prevalence, count, total_scans
+                ))
+            state.severity = severity
+            state.prevalence = prevalence
+            state.count = count
+            state.total_scans = total_scans
+
+        for key, state in previous.items():
+            if key in current:
+                continue
+            grid, disease = key
+            total_scans = totals.get(grid, 0)
+            count = next((c for g, d, c in rows if g == grid and d == disease), 0)
+            prevalence = count / total_scans if total_scans else 0.0
+            events.append(_event(
+                "outbreak.resolved", grid, disease, None, state.severity, prevalence, count, total_scans
+            ))
+            db.delete(state)
+
+        return events
+
+
+broker = create_broker()
+outbreak_detector = OutbreakDetector(broker)
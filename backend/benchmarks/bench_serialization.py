@@ -0,0 +1,92 @@
+"""
+Serialization Benchmark - AgriShield AI
+Compares scan listing serialization paths in serialized rows/sec:
+- orm: ORM objects validated through ScanResponse, encoded with stdlib json
+  (what FastAPI does for response_model=List[ScanResponse])
+- fast: selected columns as row tuples encoded with orjson
+
+Usage (from backend/):
+    python benchmarks/bench_serialization.py [rows] [repeats]
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+# Always benchmark against a throwaway SQLite database
+_db_file = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_file.name}"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydantic import TypeAdapter  # noqa: E402
+from typing import List  # noqa: E402
+
+from database import SessionLocal, init_db  # noqa: E402
+from models import Scan  # noqa: E402
+from schemas import ScanResponse  # noqa: E402
+from serialization import SCAN_COLUMNS, scan_rows_json  # noqa: E402
+
+
+def seed(db, rows):
+    now = datetime.now(timezone.utc)
+    db.bulk_save_objects([
+        Scan(
+            disease=f"Tomato___Disease_{i % 12}",
+            confidence=0.5 + (i % 50) / 100,
+            severity=("low", "medium", "high", "critical")[i % 4],
+            symptoms=["yellowing", "wilting"],
+            climate_data={"temperature": 20 + i % 15, "humidity": 40 + i % 50, "season": "kharif"},
+            gps_grid=f"G_19.{i % 100:02d}_72.85",
+            top_3_predictions=[{"disease": "Tomato___Late_blight", "confidence": 0.8}],
+            confidence_band="high",
+            latitude=19.07,
+            longitude=72.87,
+            timestamp=now - timedelta(minutes=i),
+            created_at=now,
+        )
+        for i in range(rows)
+    ])
+    db.commit()
+
+
+def orm_path(db, limit):
+    adapter = TypeAdapter(List[ScanResponse])
+    scans = db.query(Scan).order_by(Scan.timestamp.desc()).limit(limit).all()
+    validated = adapter.validate_python(scans, from_attributes=True)
+    return json.dumps(adapter.dump_python(validated, mode="json")).encode("utf-8")
+
+
+def fast_path(db, limit):
+    rows = db.query(*SCAN_COLUMNS).order_by(Scan.timestamp.desc()).limit(limit).all()
+    return scan_rows_json(rows)
+
+
+def measure(name, fn, db, limit, repeats):
+    fn(db, limit)  # Warm up
+    start = time.perf_counter()
+    for _ in range(repeats):
+        db.expunge_all()
+        fn(db, limit)
+    elapsed = time.perf_counter() - start
+    rate = limit * repeats / elapsed
+    print(f"{name:>5}: {rate:12,.0f} rows/sec  ({elapsed / repeats * 1000:.1f} ms per {limit} rows)")
+    return rate
+
+
+if __name__ == "__main__":
+    limit = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    init_db()
+    db = SessionLocal()
+    try:
+        seed(db, limit)
+        orm_rate = measure("orm", orm_path, db, limit, repeats)
+        fast_rate = measure("fast", fast_path, db, limit, repeats)
+        print(f"speedup: {fast_rate / orm_rate:.1f}x")
+    finally:
+        db.close()
+        os.unlink(_db_file.name)
@@ -0,0 +1,68 @@
+"""
+Startup Benchmark - AgriShield AI
+Measures cold-start time from launching serve.py to the first successful
+GET /health, against a throwaway SQLite database:
+- fresh: empty database, migrations applied during startup
+- restart: schema already current, migrations are a no-op
+
+Usage (from backend/):
+    python benchmarks/bench_startup.py [workers] [runs]
+"""
+
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TIMEOUT_SECONDS = 60
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_to_first_request(database_url, workers):
+    port = _free_port()
+    env = dict(os.environ, DATABASE_URL=database_url, DATABASE_READ_URLS="")
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "serve.py", "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers)],
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < TIMEOUT_SECONDS:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.01)
+        raise RuntimeError("Server did not become ready in time")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+if __name__ == "__main__":
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else os.cpu_count() or 1
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    fresh, restart = [], []
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory() as tmp:
+            database_url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+            fresh.append(time_to_first_request(database_url, workers))
+            restart.append(time_to_first_request(database_url, workers))
+
+    print(f"workers: {workers}, runs: {runs}")
+    print(f"  fresh:   {min(fresh) * 1000:8.0f} ms best, {sum(fresh) / runs * 1000:8.0f} ms mean")
+    print(f"  restart: {min(restart) * 1000:8.0f} ms best, {sum(restart) / runs * 1000:8.0f} ms mean")
@@ -0,0 +1,175 @@
+"""
+Climate Features - AgriShield AI
+Typed climate columns extracted from Scan.climate_data, SQL band
+expressions for climate analytics, and a backfill job for existing rows
+
+Columns and backfill are applied by migrations.py; to rerun the backfill:
+    python climate.py
+"""
+
+import re
+
+from sqlalchemy import case, inspect, text
+from sqlalchemy.orm import Session
+
+from database import SessionLocal, get_engine
+from models import Scan, CLIMATE_COLUMNS_GENERATED, CLIMATE_NUMERIC_PATTERN
+
+_NUMERIC_PATTERN = re.compile(CLIMATE_NUMERIC_PATTERN)
+
+CLIMATE_NUMERIC_KEYS = ("temperature", "humidity", "rainfall")
+
+# (lower, upper) bounds, lower inclusive / upper exclusive; None is unbounded
+HUMIDITY_BANDS = [(None, 40), (40, 60), (60, 80), (80, None)]  # %
+TEMPERATURE_BANDS = [(None, 15), (15, 20), (20, 25), (25, 30), (30, 35), (35, None)]  # °C
+
+
+def _parse_number(value):
+    """
+    Parse a numeric climate value, returning None if it is not a number
+    """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        # Check the JSON text, as PostgreSQL does (e.g. 1e-07, nan)
+        value = repr(value)
+    if isinstance(value, str) and _NUMERIC_PATTERN.match(value):
+        return float(value)
+    return None
+
+
+def extract_climate_features(climate_data):
+    """
+    Extract typed climate features from a climate_data dict
+    Mirrors the generated column expressions in models.py
+    """
+    if not isinstance(climate_data, dict):
+        climate_data = {}
+
+    features = {
+        f"climate_{key}": _parse_number(climate_data.get(key))
+        for key in CLIMATE_NUMERIC_KEYS
+    }
+
+    season = climate_data.get("season")
+    features["climate_season"] = str(season).lower()[:50] if season is not None else None
+
+    return features
+
+
+def climate_columns(climate_data):
+    """
+    Column values to set on a new Scan
+    Empty on PostgreSQL, where the columns are generated by the database
+    """
+    if CLIMATE_COLUMNS_GENERATED:
+        return {}
+    return extract_climate_features(climate_data)
+
+
+def band_label(lower, upper, unit):
+    """
+    Human-readable label for a band, e.g. "60-80%" or "<15°C"
+    """
+    if lower is None:
+        return f"<{upper:g}{unit}"
+    if upper is None:
+        return f">={lower:g}{unit}"
+    return f"{lower:g}-{upper:g}{unit}"
+
+
+def band_expression(column, bands):
+    """
+    SQL CASE expression mapping a climate column to its band index
+    """
+    whens = []
+    for index, (lower, upper) in enumerate(bands):
+        if lower is None:
+            condition = column < upper
+        elif upper is None:
+            condition = column >= lower
+        else:
+            condition = (column >= lower) & (column < upper)
+        whens.append((condition, index))
+    return case(*whens, else_=None)
+
+
+def ensure_climate_columns(conn):
+    """
+    Add the climate feature columns to an existing scans table
+    Generated columns on PostgreSQL are computed for existing rows on creation
+    """
+    existing = {column["name"] for column in inspect(conn).get_columns(Scan.__tablename__)}
+    table = Scan.__table__
+    added = []
+
+    for name in ("climate_temperature", "climate_humidity", "climate_rainfall", "climate_season"):
+        if name in existing:
+            continue
+        column = table.c[name]
+        column_type = column.type.compile(dialect=conn.dialect)
+        ddl = f"ALTER TABLE {table.name} ADD COLUMN {name} {column_type}"
+        if column.computed is not None:
+            ddl += f" GENERATED ALWAYS AS ({column.computed.sqltext}) STORED"
+        conn.execute(text(ddl))
+        added.append(name)
+
+    for index in table.indexes:
+        if any(column.name in added for column in index.columns):
+            index.create(conn, checkfirst=True)
+
+    return added
+
+
+def backfill_climate_features(db: Session, batch_size: int = 500):
+    """
+    Populate climate feature columns for rows ingested before they existed
+    Returns the number of rows updated
+    """
+    if CLIMATE_COLUMNS_GENERATED:
+        return 0
+
+    updated = 0
+    last_id = 0
+
+    while True:
+        rows = db.query(Scan.id, Scan.climate_data).filter(
+            Scan.id > last_id,
+            Scan.climate_data.isnot(None),
+            Scan.climate_temperature.is_(None),
+            Scan.climate_humidity.is_(None),
+            Scan.climate_rainfall.is_(None),
+            Scan.climate_season.is_(None),
+        ).order_by(Scan.id).limit(batch_size).all()
+
+        if not rows:
+            break
+
+        mappings = []
+        for scan_id, climate_data in rows:
+            features = extract_climate_features(climate_data)
+            if any(value is not None for value in features.values()):
+                mappings.append({"id": scan_id, **features})
+
+        if mappings:
+            db.bulk_update_mappings(Scan, mappings)
+            db.commit()
+            updated += len(mappings)
+
+        last_id = rows[-1][0]
+
+    return updated
+
+
+if __name__ == "__main__":
+    with get_engine().begin() as conn:
+        added = ensure_climate_columns(conn)
+    if added:
+        print(f"✓ Added climate columns: {', '.join(added)}")
+
+    db = SessionLocal()
+    try:
+        count = backfill_climate_features(db)
+    finally:
+        db.close()
+    print(f"✓ Backfilled climate features for {count} scans")
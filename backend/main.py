@@ -3,12 +3,20 @@ Main FastAPI Application
 Crop Disease Detection Backend
 """
 
+import asyncio
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from datetime import datetime
 
-from database import init_db
-from routers import sync
+from sqlalchemy import func
+
+from database import ReadSessionLocal, warm_pools
+from migrations import pending_migrations
+from models import Scan
+from routers import sync, sync_multimodal, alerts, tiles
+from serialization import SCAN_COLUMNS
+from sketches import compact_periodically
 from schemas import HealthResponse
 
 # Create FastAPI app
@@ -30,15 +38,44 @@ app.add_middleware(
 
 # Include routers
 app.include_router(sync.router)
+app.include_router(sync_multimodal.router)
+app.include_router(alerts.router)
+app.include_router(tiles.router)
+
+
+def _warm_query_cache():
+    """
+    Run representative read queries so their compiled SQL is cached
+    """
+    db = ReadSessionLocal()
+    try:
+        db.query(*SCAN_COLUMNS).order_by(Scan.timestamp.desc()).limit(1).all()
+        db.query(Scan.disease, func.count(Scan.id)).group_by(Scan.disease).limit(1).all()
+        db.query(Scan.gps_grid, Scan.disease, func.count(Scan.id)).filter(
+            Scan.gps_grid.in_(["G_0.00_0.00"])
+        ).group_by(Scan.gps_grid, Scan.disease).all()
+    finally:
+        db.close()
 
 
 @app.on_event("startup")
 async def startup_event():
     """
-    Initialize database on startup
+    Warm connection pools and query caches before accepting traffic
+    Schema changes are applied by migrations.py (run once by serve.py)
     """
     print("Starting Crop Disease Detection API...")
-    init_db()
+    warm_pools()
+    
+    pending = pending_migrations()
+    if pending:
+        print(f"⚠ {len(pending)} pending migration(s); run: python migrations.py")
+    else:
+        _warm_query_cache()
+    
+    # Keep a reference so the background task isn't garbage collected
+    app.state.sketch_compaction = asyncio.create_task(compact_periodically())
+    
     print("✓ API ready")
 
 
@@ -68,10 +105,6 @@ async def health_check():
 
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(
-        "main:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True
-    )
+    # Development server: apply migrations, then run with auto-reload
+    from serve import main as serve
+    serve(["--reload"])
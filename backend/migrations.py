@@ -0,0 +1,132 @@
+"""
+Schema Migrations - AgriShield AI
+Versioned, run-once schema migrations
+
+Migrations run once per deployment (from serve.py in the master process,
+or manually), not on every worker startup. Applied versions are recorded
+in schema_migrations; on PostgreSQL an advisory lock serializes concurrent
+runs from several hosts.
+
+Usage:
+    python migrations.py           # apply pending migrations
+    python migrations.py --status  # list pending migrations
+"""
+
+import sys
+from contextlib import contextmanager
+
+from sqlalchemy import inspect, select, text
+from sqlalchemy.orm import Session
+
+from database import Base, get_engine
+from models import SchemaMigration
+from climate import ensure_climate_columns, backfill_climate_features
+from sketches import rebuild_sketches
+from tiles import ensure_grid_columns, backfill_grid_columns
+
+# Arbitrary key for pg_advisory_lock
+_MIGRATION_LOCK_KEY = 7320514
+
+
+def _initial_schema(conn):
+    # Creates missing tables only; existing tables are left untouched
+    Base.metadata.create_all(bind=conn)
+
+
+def _climate_features(conn):
+    ensure_climate_columns(conn)
+    backfill_climate_features(Session(bind=conn))
+
+
+def _scan_sketches(conn):
+    rebuild_sketches(Session(bind=conn))
+
+
+def _grid_coordinates(conn):
+    ensure_grid_columns(conn)
+    backfill_grid_columns(Session(bind=conn))
+
+
+def _active_outbreaks(conn):
+    # Imported here: alerts creates its broker on import, and serve.py
+    # chooses ALERT_BROKER after importing this module
+    from alerts import seed_outbreaks
+    seed_outbreaks(Session(bind=conn))
+
+
+# (version, name, apply(conn)) in order; never renumber applied versions
+MIGRATIONS = [
+    (1, "initial schema", _initial_schema),
+    (2, "climate feature columns", _climate_features),
+    (3, "scan sketches from existing scans", _scan_sketches),
+    (4, "grid coordinate columns", _grid_coordinates),
+    (5, "active outbreaks from existing scans", _active_outbreaks),
+]
+
+
+@contextmanager
+def _migration_lock(engine):
+    if engine.dialect.name != "postgresql":
+        yield
+        return
+    with engine.connect() as conn:
+        conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": _MIGRATION_LOCK_KEY})
+        try:
+            yield
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": _MIGRATION_LOCK_KEY})
+
+
+def applied_versions(conn):
+    """
+    Versions recorded in schema_migrations
+    """
+    if not inspect(conn).has_table(SchemaMigration.__tablename__):
+        return set()
+    return set(conn.execute(select(SchemaMigration.version)).scalars())
+
+
+def pending_migrations(engine=None):
+    """
+    Migrations not yet applied, as (version, name) pairs
+    """
+    engine = engine or get_engine()
+    with engine.connect() as conn:
+        applied = applied_versions(conn)
+    return [(version, name) for version, name, _ in MIGRATIONS if version not in applied]
+
+
+def run_migrations(engine=None):
+    """
+    Apply pending migrations, each in its own transaction
+    Returns the applied (version, name) pairs
+    """
+    engine = engine or get_engine()
+    applied_now = []
+
+    with _migration_lock(engine):
+        with engine.begin() as conn:
+            SchemaMigration.__table__.create(conn, checkfirst=True)
+            applied = applied_versions(conn)
+
+        for version, name, apply in MIGRATIONS:
+            if version in applied:
+                continue
+            with engine.begin() as conn:
+                apply(conn)
+                conn.execute(SchemaMigration.__table__.insert().values(version=version, name=name))
+            print(f"✓ Applied migration {version}: {name}")
+            applied_now.append((version, name))
+
+    return applied_now
+
+
+if __name__ == "__main__":
+    if "--status" in sys.argv:
+        pending = pending_migrations()
+        for version, name in pending:
+            print(f"  pending {version}: {name}")
+        print(f"{len(pending)} pending migration(s)")
+    else:
+        applied = run_migrations()
+        print(f"✓ Schema up to date ({len(applied)} migration(s) applied)")
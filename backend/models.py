@@ -3,9 +3,39 @@ Database Models
 SQLAlchemy ORM models for scan records
 """
 
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Index, JSON
+from sqlalchemy import (
+    Column, Integer, String, Float, Date, DateTime, Boolean, Index, JSON, Computed,
+    LargeBinary, UniqueConstraint
+)
 from sqlalchemy.sql import func
-from database import Base
+from database import Base, DATABASE_BACKEND
+
+# Climate features are generated from climate_data by PostgreSQL itself;
+# other backends (SQLite) get plain columns populated on ingest.
+CLIMATE_COLUMNS_GENERATED = DATABASE_BACKEND == "postgresql"
+
+# Numeric climate values, matched against the JSON text of the value on both
+# backends (PostgreSQL ->> text, Python repr). Digit limits keep every match
+# within double precision range, so the cast never fails.
+CLIMATE_NUMERIC_PATTERN = r"^\s*-?[0-9]{1,30}(\.[0-9]+)?([eE][-+]?[0-9]{1,2})?\s*$"
+
+
+def _climate_numeric_sql(key):
+    """
+    PostgreSQL expression casting climate_data->>key to a float,
+    yielding NULL for missing or non-numeric values
+    """
+    value = f"(climate_data ->> '{key}')"
+    return f"CASE WHEN {value} ~ '{CLIMATE_NUMERIC_PATTERN}' THEN {value}::double precision END"
+
+
+def _climate_column(type_, expression):
+    """
+    Typed climate feature column (generated on PostgreSQL)
+    """
+    if CLIMATE_COLUMNS_GENERATED:
+        return Column(type_, Computed(expression, persisted=True), nullable=True)
+    return Column(type_, nullable=True)
 
 
 class Scan(Base):
@@ -31,6 +61,16 @@ class Scan(Base):
     top_3_predictions = Column(JSON, nullable=True)  # Top 3 disease predictions with confidence
     confidence_band = Column(String(20), nullable=True)  # low/medium/high
     
+    # Typed climate features extracted from climate_data (see climate.py)
+    climate_temperature = _climate_column(Float, _climate_numeric_sql('temperature'))  # °C
+    climate_humidity = _climate_column(Float, _climate_numeric_sql('humidity'))  # %
+    climate_rainfall = _climate_column(Float, _climate_numeric_sql('rainfall'))  # mm
+    climate_season = _climate_column(String(50), "substr(lower(climate_data ->> 'season'), 1, 50)")
+    
+    # Grid cell coordinates parsed from gps_grid, for map tile queries (see tiles.py)
+    grid_lat = Column(Float, nullable=True)
+    grid_lon = Column(Float, nullable=True)
+    
     # Legacy GPS coordinates (kept for backward compatibility)
     latitude = Column(Float, nullable=True)
     longitude = Column(Float, nullable=True)
@@ -49,6 +89,10 @@ class Scan(Base):
         Index('idx_created_at', 'created_at'),
         Index('idx_gps_grid', 'gps_grid'),  # For regional outbreak analytics
         Index('idx_confidence_band', 'confidence_band'),
+        Index('idx_climate_humidity', 'climate_humidity'),  # For climate analytics
+        Index('idx_climate_temperature', 'climate_temperature'),
+        Index('idx_climate_season', 'climate_season'),
+        Index('idx_grid_coords', 'grid_lat', 'grid_lon'),  # For heatmap tiles
     )
 
     def __repr__(self):
@@ -71,3 +115,72 @@ class ImageMetadata(Base):
     
     def __repr__(self):
         return f"<ImageMetadata(id={self.id}, filename='{self.filename}')>"
+
+
+class ScanSketch(Base):
+    """
+    Approximate sketch model
+    Stores mergeable scan summaries per GPS grid (or "*" for all grids)
+    and day. Ingest appends delta rows; compaction folds them into one
+    row per (scope, bucket) plus an all-time rollup per scope with
+    bucket NULL (see sketches.py)
+    """
+    __tablename__ = "scan_sketches"
+
+    id = Column(Integer, primary_key=True, index=True)
+    scope = Column(String(50), nullable=False)  # gps_grid or "*"
+    bucket = Column(Date, nullable=True)  # Day of scan timestamp (UTC); NULL for rollup
+    is_delta = Column(Boolean, nullable=False, default=False)  # Awaiting compaction
+    total = Column(Integer, nullable=False, default=0)  # Exact scan count
+    data = Column(LargeBinary, nullable=False)  # Serialized SketchSet
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        Index('idx_sketch_scope_bucket', 'scope', 'bucket'),
+        Index('idx_sketch_bucket', 'bucket'),
+        Index('idx_sketch_is_delta', 'is_delta'),
+    )
+
+    def __repr__(self):
+        return f"<ScanSketch(scope='{self.scope}', bucket={self.bucket}, total={self.total})>"
+
+
+class ActiveOutbreak(Base):
+    """
+    Active outbreak model
+    Current outbreak state per GPS grid and disease, kept by the outbreak
+    detector so alerts fire only on changes (see alerts.py)
+    """
+    __tablename__ = "active_outbreaks"
+
+    id = Column(Integer, primary_key=True, index=True)
+    gps_grid = Column(String(50), nullable=False)
+    disease = Column(String(255), nullable=False)
+    severity = Column(String(50), nullable=False)  # medium/high/critical
+    prevalence = Column(Float, nullable=False)
+    count = Column(Integer, nullable=False)
+    total_scans = Column(Integer, nullable=False)
+    started_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        UniqueConstraint('gps_grid', 'disease', name='uq_outbreak_grid_disease'),
+    )
+
+    def __repr__(self):
+        return f"<ActiveOutbreak(gps_grid='{self.gps_grid}', disease='{self.disease}', severity='{self.severity}')>"
+
+
+class SchemaMigration(Base):
+    """
+    Schema migration model
+    Records which versioned migrations have been applied (see migrations.py)
+    """
+    __tablename__ = "schema_migrations"
+
+    version = Column(Integer, primary_key=True)
+    name = Column(String(255), nullable=False)
+    applied_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<SchemaMigration(version={self.version}, name='{self.name}')>"
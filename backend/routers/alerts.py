@@ -0,0 +1,94 @@
+"""
+Alerts Router - AgriShield AI
+Push outbreak alerts to dashboards over Server-Sent Events and WebSocket
+"""
+
+import asyncio
+import json
+
+from fastapi import APIRouter, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+
+from alerts import broker
+
+router = APIRouter(prefix="/api/alerts", tags=["alerts"])
+
+HEARTBEAT_SECONDS = 15
+
+
+def _parse_filter(value: str = None):
+    """
+    Parse a comma-separated filter into a list (None means no filter)
+    """
+    if not value:
+        return None
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+@router.get("/stream")
+async def stream_alerts(
+    request: Request,
+    gps_grid: str = None,
+    disease: str = None
+):
+    """
+    Stream outbreak alerts as Server-Sent Events
+    Optional comma-separated gps_grid / disease filters
+    """
+    subscription = broker.subscribe(_parse_filter(gps_grid), _parse_filter(disease))
+
+    async def events():
+        try:
+            yield ": connected\n\n"
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": heartbeat\n\n"
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            broker.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.websocket("/ws")
+async def websocket_alerts(
+    websocket: WebSocket,
+    gps_grid: str = None,
+    disease: str = None
+):
+    """
+    Push outbreak alerts over a WebSocket
+    Optional comma-separated gps_grid / disease filters
+    """
+    await websocket.accept()
+    subscription = broker.subscribe(_parse_filter(gps_grid), _parse_filter(disease))
+
+    async def wait_for_disconnect():
+        # Clients don't send anything; receive only to notice disconnects
+        while True:
+            await websocket.receive_text()
+
+    receiver = asyncio.create_task(wait_for_disconnect())
+    try:
+        while not receiver.done():
+            getter = asyncio.create_task(subscription.queue.get())
+            done, _ = await asyncio.wait(
+                {getter, receiver},
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            if getter in done:
+                await websocket.send_json(getter.result())
+            else:
+                getter.cancel()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receiver.cancel()
+        broker.unsubscribe(subscription)
@@ -3,15 +3,23 @@ Sync Router
 API endpoints for syncing offline data
 """
 
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 import os
 import shutil
 from datetime import datetime
 
-from database import get_db
+from database import get_db, get_read_db
 from models import Scan, ImageMetadata
+from sketches import GLOBAL_SCOPE, load_sketches, count_bounds, update_sketches, window_start
+from serialization import (
+    FAST_SERIALIZATION,
+    SCAN_COLUMNS,
+    scan_rows_response,
+    scan_row_response,
+    json_response,
+)
 from schemas import (
     ScanCreate,
     ScanResponse,
@@ -22,8 +30,7 @@ from schemas import (
 
 router = APIRouter(prefix="/api", tags=["sync"])
 
-UPLOAD_DIR = "uploads"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "uploads")
 
 
 @router.post("/sync", response_model=BatchSyncResponse)
@@ -36,6 +43,7 @@ async def sync_scans(
     """
     try:
         synced_count = 0
+        scans = []
         
         for scan_data in request.scans:
             # Create scan record
@@ -50,8 +58,10 @@ async def sync_scans(
             )
             
             db.add(scan)
+            scans.append(scan)
             synced_count += 1
         
+        update_sketches(db, scans)
         db.commit()
         
         return BatchSyncResponse(
@@ -79,6 +89,7 @@ async def upload_image(
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"{timestamp}_{image.filename}"
         file_path = os.path.join(UPLOAD_DIR, filename)
+        os.makedirs(UPLOAD_DIR, exist_ok=True)
         
         # Save file
         with open(file_path, "wb") as buffer:
@@ -114,7 +125,7 @@ async def get_scans(
     skip: int = 0,
     limit: int = 100,
     disease: str = None,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Get scan history with optional filtering
@@ -125,19 +136,30 @@ async def get_scans(
         if disease:
             query = query.filter(Scan.disease.ilike(f"%{disease}%"))
         
-        scans = query.order_by(Scan.timestamp.desc()).offset(skip).limit(limit).all()
+        query = query.order_by(Scan.timestamp.desc()).offset(skip).limit(limit)
+        
+        if FAST_SERIALIZATION:
+            return scan_rows_response(query.with_entities(*SCAN_COLUMNS).all())
         
-        return scans
+        return query.all()
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Query failed: {str(e)}")
 
 
 @router.get("/scans/{scan_id}", response_model=ScanResponse)
-async def get_scan(scan_id: int, db: Session = Depends(get_db)):
+async def get_scan(scan_id: int, db: Session = Depends(get_read_db)):
     """
     Get specific scan by ID
     """
+    if FAST_SERIALIZATION:
+        row = db.query(*SCAN_COLUMNS).filter(Scan.id == scan_id).first()
+        
+        if not row:
+            raise HTTPException(status_code=404, detail="Scan not found")
+        
+        return scan_row_response(row)
+    
     scan = db.query(Scan).filter(Scan.id == scan_id).first()
     
     if not scan:
@@ -147,11 +169,20 @@ async def get_scan(scan_id: int, db: Session = Depends(get_db)):
 
 
 @router.get("/stats")
-async def get_stats(db: Session = Depends(get_db)):
+async def get_stats(
+    approx: bool = False,
+    days: Optional[int] = Query(None, ge=1),
+    db: Session = Depends(get_read_db)
+):
     """
     Get statistics about scans
+    With approx=true, answers from ingest-time sketches with error bounds,
+    optionally limited to the last `days` days
     """
     try:
+        if approx:
+            return json_response(_approx_stats(db, days))
+        
         total_scans = db.query(Scan).count()
         
         # Count by severity
@@ -167,11 +198,62 @@ async def get_stats(db: Session = Depends(get_db)):
             func.count(Scan.id).label('count')
         ).group_by(Scan.disease).order_by(func.count(Scan.id).desc()).limit(10).all()
         
-        return {
+        return json_response({
             "total_scans": total_scans,
             "severity_distribution": severity_counts,
             "top_diseases": [{"disease": d[0], "count": d[1]} for d in top_diseases]
-        }
+        })
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Stats query failed: {str(e)}")
+
+
+def _approx_stats(db: Session, days: int = None):
+    """
+    Statistics merged from the global sketches
+    """
+    sketch = load_sketches(db, GLOBAL_SCOPE, since=window_start(days)).get(GLOBAL_SCOPE)
+    
+    if sketch is None:
+        return {
+            "approximate": True,
+            "days": days,
+            "total_scans": 0,
+            "severity_distribution": {},
+            "top_diseases": [],
+            "distinct_grids": None,
+            "confidence_quantiles": {}
+        }
+    
+    diseases = sketch.diseases
+    grids = sketch.grids
+    distinct_grids = round(grids.estimate())
+    
+    return {
+        "approximate": True,
+        "days": days,
+        "total_scans": sketch.total,
+        "severity_distribution": sketch.severity,
+        "top_diseases": [
+            {"disease": disease, "count": count, **count_bounds(diseases, count)}
+            for disease, count in diseases.top(10)
+        ],
+        "distinct_grids": {
+            "estimate": distinct_grids,
+            "relative_error": round(grids.relative_error, 4),
+            "lower": max(0, round(distinct_grids * (1 - 2 * grids.relative_error))),
+            "upper": round(distinct_grids * (1 + 2 * grids.relative_error))
+        },
+        "confidence_quantiles": {
+            f"p{int(q * 100)}": {
+                "value": round(sketch.confidence.quantile(q), 4),
+                "rank_error": round(sketch.confidence.rank_error(q), 4)
+            }
+            for q in (0.1, 0.5, 0.9, 0.99)
+        },
+        "error_bounds": {
+            "count_epsilon": round(diseases.epsilon, 4),
+            "count_confidence": round(1 - diseases.delta, 4),
+            "distinct_interval": "95%"
+        }
+    }
@@ -3,14 +3,25 @@ Enhanced Sync Router - AgriShield AI
 API endpoints for syncing multimodal data and regional analytics
 """
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import func, distinct
-from typing import List, Dict
+from typing import List, Dict, Optional
 from datetime import datetime
 
-from database import get_db
+from database import get_db, get_read_db
 from models import Scan
+from climate import (
+    climate_columns,
+    band_expression,
+    band_label,
+    HUMIDITY_BANDS,
+    TEMPERATURE_BANDS,
+)
+from sketches import load_sketches, count_bounds, update_sketches, window_start
+from alerts import outbreak_detector, outbreak_severity
+from serialization import json_response
+from tiles import tile_cache, grid_columns
 from schemas import (
     ScanCreate,
     ScanResponse,
@@ -32,6 +43,7 @@ async def sync_multimodal_scans(
     """
     try:
         synced_count = 0
+        scans = []
         
         for scan_data in request.scans:
             # Create scan record with multimodal data
@@ -49,14 +61,34 @@ async def sync_multimodal_scans(
                 gps_grid=scan_data.gps_grid if hasattr(scan_data, 'gps_grid') else None,
                 top_3_predictions=scan_data.top_3_predictions if hasattr(scan_data, 'top_3_predictions') else None,
                 confidence_band=scan_data.confidence_band if hasattr(scan_data, 'confidence_band') else None,
+                # Typed climate features (generated by the database on PostgreSQL)
+                **climate_columns(scan_data.climate_data),
+                **grid_columns(scan_data.gps_grid),
                 synced=True
             )
             
             db.add(scan)
+            scans.append(scan)
             synced_count += 1
         
+        update_sketches(db, scans)
         db.commit()
         
+        touched_grids = {scan.gps_grid for scan in scans if scan.gps_grid}
+        
+        # Drop cached heatmap tiles for the grids this batch touched
+        try:
+            tile_cache.invalidate_grids(touched_grids)
+        except Exception as e:
+            print(f"⚠ Tile invalidation failed: {str(e)}")
+        
+        # Push outbreak changes for the grids this batch touched
+        try:
+            outbreak_detector.evaluate(db, touched_grids)
+        except Exception as e:
+            db.rollback()
+            print(f"⚠ Outbreak detection failed: {str(e)}")
+        
         return BatchSyncResponse(
             success=True,
             synced_count=synced_count,
@@ -72,7 +104,7 @@ async def sync_multimodal_scans(
 async def get_regional_analytics(
     gps_grid: str,
     radius: int = 1,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Get regional disease analytics for a GPS grid
@@ -104,14 +136,14 @@ async def get_regional_analytics(
         scans = db.query(Scan).filter(Scan.gps_grid.in_(nearby_grids)).all()
         
         if not scans:
-            return {
+            return json_response({
                 "gps_grid": gps_grid,
                 "total_scans": 0,
                 "disease_prevalence": {},
                 "outbreaks": [],
                 "nearby_grids": nearby_grids,
                 "radius_km": radius * 5
-            }
+            })
         
         # Calculate disease prevalence
         total_scans = len(scans)
@@ -146,7 +178,7 @@ async def get_regional_analytics(
         # Sort by prevalence
         outbreaks.sort(key=lambda x: x["prevalence"], reverse=True)
         
-        return {
+        return json_response({
             "gps_grid": gps_grid,
             "total_scans": total_scans,
             "disease_prevalence": disease_prevalence,
@@ -154,7 +186,7 @@ async def get_regional_analytics(
             "nearby_grids": nearby_grids,
             "radius_km": radius * 5,
             "has_outbreak": len(outbreaks) > 0
-        }
+        })
     
     except HTTPException:
         raise
@@ -165,7 +197,7 @@ async def get_regional_analytics(
 @router.post("/analytics/regional")
 async def sync_regional_analytics(
     regional_data: Dict,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Sync regional analytics data from mobile devices
@@ -194,7 +226,7 @@ async def sync_regional_analytics(
                 "lastUpdated": int(datetime.now().timestamp() * 1000)
             }
         
-        return server_data
+        return json_response(server_data)
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Regional analytics sync failed: {str(e)}")
@@ -204,12 +236,19 @@ async def sync_regional_analytics(
 async def get_all_outbreaks(
     threshold: float = 0.3,
     limit: int = 10,
-    db: Session = Depends(get_db)
+    approx: bool = False,
+    days: Optional[int] = Query(None, ge=1),
+    db: Session = Depends(get_read_db)
 ):
     """
     Get all active disease outbreaks across all regions
+    With approx=true, answers from per-grid sketches with error bounds,
+    optionally limited to the last `days` days
     """
     try:
+        if approx:
+            return json_response(_approx_outbreaks(db, threshold, limit, days))
+        
         # Get all grids with scans
         grids = db.query(distinct(Scan.gps_grid)).filter(Scan.gps_grid.isnot(None)).all()
         
@@ -240,24 +279,70 @@ async def get_all_outbreaks(
                         "percentage": round(prevalence * 100, 1),
                         "count": count,
                         "total_scans": total_scans,
-                        "severity": "critical" if prevalence >= 0.7 else "high" if prevalence >= 0.5 else "medium"
+                        "severity": outbreak_severity(prevalence)
                     })
         
         # Sort by prevalence (highest first)
         all_outbreaks.sort(key=lambda x: x["prevalence"], reverse=True)
         
-        return {
+        return json_response({
             "total_outbreaks": len(all_outbreaks),
             "threshold": threshold,
             "outbreaks": all_outbreaks[:limit]
-        }
+        })
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Outbreak query failed: {str(e)}")
 
 
+def _approx_outbreaks(db: Session, threshold: float, limit: int, days: int = None):
+    """
+    Outbreaks from per-grid heavy-hitter sketches
+    """
+    all_outbreaks = []
+    epsilon = None
+    
+    for grid, sketch in load_sketches(db, since=window_start(days)).items():
+        total_scans = sketch.total
+        if total_scans == 0:
+            continue
+        
+        epsilon = sketch.diseases.epsilon
+        for disease, count in sketch.diseases.top():
+            prevalence = count / total_scans
+            if prevalence < threshold:
+                break
+            
+            bounds = count_bounds(sketch.diseases, count)
+            all_outbreaks.append({
+                "gps_grid": grid,
+                "disease": disease,
+                "prevalence": round(prevalence, 3),
+                "prevalence_lower": round(bounds["lower"] / total_scans, 3),
+                "percentage": round(prevalence * 100, 1),
+                "count": count,
+                "count_lower": bounds["lower"],
+                "total_scans": total_scans,
+                "severity": outbreak_severity(prevalence)
+            })
+    
+    all_outbreaks.sort(key=lambda x: x["prevalence"], reverse=True)
+    
+    return {
+        "approximate": True,
+        "days": days,
+        "total_outbreaks": len(all_outbreaks),
+        "threshold": threshold,
+        "outbreaks": all_outbreaks[:limit],
+        "error_bounds": {
+            "count_epsilon": round(epsilon, 4) if epsilon is not None else None,
+            "note": "counts may overestimate by at most count_epsilon * total_scans per grid"
+        }
+    }
+
+
 @router.get("/analytics/confidence-bands")
-async def get_confidence_band_stats(db: Session = Depends(get_db)):
+async def get_confidence_band_stats(db: Session = Depends(get_read_db)):
     """
     Get statistics on confidence bands
     """
@@ -265,11 +350,11 @@ async def get_confidence_band_stats(db: Session = Depends(get_db)):
         total_scans = db.query(Scan).filter(Scan.confidence_band.isnot(None)).count()
         
         if total_scans == 0:
-            return {
+            return json_response({
                 "total_scans": 0,
                 "distribution": {},
                 "recovery_needed": 0
-            }
+            })
         
         # Count by confidence band
         band_counts = {}
@@ -283,12 +368,72 @@ async def get_confidence_band_stats(db: Session = Depends(get_db)):
         # Count scans that needed recovery (low confidence)
         recovery_needed = db.query(Scan).filter(Scan.confidence_band == 'low').count()
         
-        return {
+        return json_response({
             "total_scans": total_scans,
             "distribution": band_counts,
             "recovery_needed": recovery_needed,
             "recovery_percentage": round((recovery_needed / total_scans) * 100, 1)
-        }
+        })
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Confidence stats query failed: {str(e)}")
+
+
+def _climate_band_distribution(db: Session, column, bands, unit, gps_grid=None):
+    """
+    Disease counts per climate band, binned and aggregated in SQL
+    """
+    band = band_expression(column, bands).label("band")
+    query = db.query(band, Scan.disease, func.count(Scan.id)).filter(column.isnot(None))
+
+    if gps_grid:
+        query = query.filter(Scan.gps_grid == gps_grid)
+
+    rows = query.group_by(band, Scan.disease).all()
+
+    distribution = [
+        {
+            "band": band_label(lower, upper, unit),
+            "min": lower,
+            "max": upper,
+            "total_scans": 0,
+            "diseases": {}
+        }
+        for lower, upper in bands
+    ]
+
+    for band_index, disease, count in rows:
+        entry = distribution[band_index]
+        entry["diseases"][disease] = count
+        entry["total_scans"] += count
+
+    for entry in distribution:
+        entry["diseases"] = dict(
+            sorted(entry["diseases"].items(), key=lambda item: item[1], reverse=True)
+        )
+
+    return distribution
+
+
+@router.get("/analytics/climate")
+async def get_climate_analytics(
+    gps_grid: str = None,
+    db: Session = Depends(get_read_db)
+):
+    """
+    Get disease distributions binned by humidity and temperature bands
+    Optionally restricted to a single GPS grid
+    """
+    try:
+        return json_response({
+            "gps_grid": gps_grid,
+            "humidity": _climate_band_distribution(
+                db, Scan.climate_humidity, HUMIDITY_BANDS, "%", gps_grid
+            ),
+            "temperature": _climate_band_distribution(
+                db, Scan.climate_temperature, TEMPERATURE_BANDS, "°C", gps_grid
+            )
+        })
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Climate analytics query failed: {str(e)}")
@@ -0,0 +1,90 @@
+"""
+Tiles Router - AgriShield AI
+Disease heatmap tiles for the regional map view
+"""
+
+import gzip
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import Response
+from sqlalchemy.orm import Session
+
+from database import get_db
+from tiles import tile_cache, valid_tile
+
+router = APIRouter(prefix="/api/tiles", tags=["tiles"])
+
+
+def accepts_gzip(accept_encoding):
+    """
+    Whether an Accept-Encoding header allows gzip, honouring q-values
+    ("gzip;q=0" refuses it; "*" covers codings not listed)
+    """
+    qualities = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding] = quality
+
+    if "gzip" in qualities:
+        return qualities["gzip"] > 0
+    return qualities.get("*", 0) > 0
+
+
+def etag_matches(if_none_match, etag):
+    """
+    Whether an If-None-Match header matches etag ("*" or a list of
+    entity tags, compared weakly)
+    """
+    if if_none_match.strip() == "*":
+        return True
+    candidates = {candidate.strip() for candidate in if_none_match.split(",")}
+    return etag.removeprefix("W/") in {candidate.removeprefix("W/") for candidate in candidates}
+
+
+@router.get("/{z}/{x}/{y}")
+async def get_tile(
+    z: int,
+    x: int,
+    y: int,
+    request: Request,
+    db: Session = Depends(get_db)
+):
+    """
+    Get per-disease scan counts for every GPS grid cell in a map tile
+    Supports ETag revalidation and gzip transfer encoding
+    Tiles are built from the primary so the cache never holds replica lag
+    """
+    if not valid_tile(z, x, y):
+        raise HTTPException(status_code=400, detail="Invalid tile coordinates")
+
+    try:
+        data, etag = tile_cache.get(db, z, x, y)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Tile query failed: {str(e)}")
+
+    gzipped = accepts_gzip(request.headers.get("accept-encoding", ""))
+    if gzipped:
+        # Strong validators must differ per content-coding
+        etag = etag[:-1] + '-gz"'
+
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+
+    if etag_matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=304, headers=headers)
+
+    if gzipped:
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=data, media_type="application/json", headers=headers)
+
+    return Response(content=gzip.decompress(data), media_type="application/json", headers=headers)
@@ -0,0 +1,85 @@
+"""
+Fast Serialization - AgriShield AI
+Encode scan rows and analytics payloads straight to JSON bytes with orjson,
+skipping per-row Pydantic model construction and the stdlib json encoder
+
+Toggle with FAST_SERIALIZATION (default: true)
+"""
+
+import os
+
+import orjson
+from fastapi.responses import Response
+
+from models import Scan
+
+FAST_SERIALIZATION = os.getenv("FAST_SERIALIZATION", "true").lower() in ("1", "true", "yes")
+
+# Columns selected for scan listings, in ScanResponse field order
+SCAN_FIELDS = (
+    "id",
+    "disease",
+    "confidence",
+    "severity",
+    "symptoms",
+    "climate_data",
+    "gps_grid",
+    "top_3_predictions",
+    "confidence_band",
+    "latitude",
+    "longitude",
+    "timestamp",
+    "created_at",
+)
+
+SCAN_COLUMNS = tuple(getattr(Scan, field) for field in SCAN_FIELDS)
+
+_ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+
+class FastJSONResponse(Response):
+    """
+    JSON response rendered with orjson
+    """
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=_ORJSON_OPTIONS)
+
+
+def scan_rows_json(rows) -> bytes:
+    """
+    Encode (SCAN_COLUMNS) row tuples as a JSON array of scan objects
+    """
+    return orjson.dumps([dict(zip(SCAN_FIELDS, row)) for row in rows], option=_ORJSON_OPTIONS)
+
+
+def scan_row_json(row) -> bytes:
+    """
+    Encode a single (SCAN_COLUMNS) row tuple as a JSON scan object
+    """
+    return orjson.dumps(dict(zip(SCAN_FIELDS, row)), option=_ORJSON_OPTIONS)
+
+
+def scan_rows_response(rows):
+    """
+    Scan listing response from row tuples
+    """
+    return Response(content=scan_rows_json(rows), media_type="application/json")
+
+
+def scan_row_response(row):
+    """
+    Single scan response from a row tuple
+    """
+    return Response(content=scan_row_json(row), media_type="application/json")
+
+
+def json_response(content):
+    """
+    Analytics payload as an orjson response, or unchanged (for FastAPI's
+    default encoder) when fast serialization is disabled
+    """
+    if FAST_SERIALIZATION:
+        return FastJSONResponse(content)
+    return content
@@ -0,0 +1,94 @@
+"""
+Production Launcher - AgriShield AI
+Applies schema migrations once, then serves the API
+
+Modes:
+- multi-worker (default): pre-fork gunicorn master with uvicorn workers,
+  sized to CPU cores. The app is imported once in the master and forked;
+  each worker warms its pools and caches (main.startup_event) before it
+  accepts traffic. Outbreak alerts default to the shared file broker.
+- --reload: single uvicorn process with auto-reload for development
+
+Falls back to uvicorn's own multi-process mode where gunicorn is not
+available (e.g. Windows).
+
+Usage:
+    python serve.py [--host 0.0.0.0] [--port 8000] [--workers N] [--reload]
+"""
+
+import argparse
+import os
+
+import uvicorn
+
+from database import dispose_engines
+from migrations import run_migrations
+
+
+def default_workers():
+    """
+    Worker count from WEB_CONCURRENCY, else one per CPU core
+    """
+    return int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1))
+
+
+def _post_fork(server, worker):
+    # Never share pooled connections from the master with a worker
+    dispose_engines()
+
+
+def _serve_prefork(host, port, workers):
+    from gunicorn.app.base import BaseApplication
+
+    class Application(BaseApplication):
+        def load_config(self):
+            for key, value in {
+                "bind": f"{host}:{port}",
+                "workers": workers,
+                "worker_class": "uvicorn.workers.UvicornWorker",
+                "preload_app": True,
+                "post_fork": _post_fork,
+            }.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from main import app
+            return app
+
+    Application().run()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the AgriShield AI API")
+    parser.add_argument("--host", default=os.getenv("API_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("API_PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=default_workers())
+    parser.add_argument("--reload", action="store_true", help="development mode")
+    parser.add_argument("--skip-migrations", action="store_true")
+    args = parser.parse_args(argv)
+
+    if args.workers > 1 and not args.reload:
+        # Workers only see alerts published in their own process otherwise
+        if os.environ.setdefault("ALERT_BROKER", "file") == "memory":
+            parser.error("ALERT_BROKER=memory needs a single worker; use ALERT_BROKER=file or --workers 1")
+
+    if not args.skip_migrations:
+        run_migrations()
+        # Workers create their own engines on first use
+        dispose_engines()
+
+    if args.reload:
+        uvicorn.run("main:app", host=args.host, port=args.port, reload=True)
+        return
+
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        uvicorn.run("main:app", host=args.host, port=args.port, workers=args.workers)
+        return
+
+    _serve_prefork(args.host, args.port, args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,594 @@
+"""
+Approximate Sketches - AgriShield AI
+Mergeable streaming summaries of scans for national-scale dashboards:
+- HyperLogLog for distinct reporting grids
+- Count-Min with top-k for heavy-hitter diseases
+- t-digest for confidence distributions
+
+Sketches are kept per (gps_grid, day) and globally per day in the
+scan_sketches table, and merged at query time. Ingest only appends one
+delta row per (scope, day) a batch touches, so it never locks shared rows;
+a background compaction folds deltas into one row per (scope, day) and
+into an all-time rollup per scope, so all-time queries read one row per
+scope plus any deltas not yet compacted.
+
+Rebuild all sketches from the scans table, or compact pending deltas, with:
+    python sketches.py
+    python sketches.py --compact
+"""
+
+import asyncio
+import hashlib
+import math
+import os
+import struct
+import sys
+import zlib
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import insert, text
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from models import Scan, ScanSketch
+
+GLOBAL_SCOPE = "*"
+
+SEVERITIES = ("low", "medium", "high", "critical")
+
+# Sketch dimensions; sketches only merge with identically sized ones
+HLL_PRECISION = 12  # 4096 registers, ~1.6% standard error
+CMS_WIDTH = 272  # epsilon = e / width ~= 0.01
+CMS_DEPTH = 5  # delta = e^-depth ~= 0.007
+TOP_K = 20
+TDIGEST_COMPRESSION = 100
+
+_FORMAT_VERSION = 1
+
+# Seconds between background compactions, and deltas folded per run
+COMPACT_INTERVAL_SECONDS = float(os.getenv("SKETCH_COMPACT_SECONDS", "60"))
+COMPACT_BATCH_SIZE = 5000
+
+# Arbitrary key for pg_try_advisory_xact_lock
+_COMPACTION_LOCK_KEY = 7320515
+
+
+def _hash64(value):
+    """
+    Stable 64-bit hash (identical across processes and workers)
+    """
+    digest = hashlib.blake2b(str(value).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+class HyperLogLog:
+    """
+    HyperLogLog distinct counter
+    """
+
+    def __init__(self, precision=HLL_PRECISION, registers=None):
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = bytearray(registers) if registers is not None else bytearray(self.m)
+
+    def add(self, value):
+        h = _hash64(value)
+        index = h >> (64 - self.precision)
+        remaining = (h << self.precision) & ((1 << 64) - 1)
+        rank = 64 - self.precision + 1 if remaining == 0 else 64 - remaining.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLogs of different precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def estimate(self):
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        raw = alpha * self.m * self.m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * self.m and zeros:
+            return self.m * math.log(self.m / zeros)  # Linear counting
+        return raw
+
+    @property
+    def relative_error(self):
+        """
+        Standard error of the estimate, relative to the true count
+        """
+        return 1.04 / math.sqrt(self.m)
+
+    def to_bytes(self):
+        return struct.pack("<B", self.precision) + bytes(self.registers)
+
+    @classmethod
+    def from_bytes(cls, data):
+        return cls(data[0], data[1:])
+
+
+class CountMinTopK:
+    """
+    Count-Min sketch with a top-k heavy-hitter candidate set
+    Estimates never undercount; overcount is at most epsilon * total
+    with probability 1 - delta
+    """
+
+    def __init__(self, width=CMS_WIDTH, depth=CMS_DEPTH, k=TOP_K, counters=None, candidates=None):
+        self.width = width
+        self.depth = depth
+        self.k = k
+        self.counters = list(counters) if counters is not None else [0] * (width * depth)
+        self.candidates = dict(candidates or {})
+        self.total = 0
+
+    def _cells(self, item):
+        h = _hash64(item)
+        h1, h2 = h >> 32, (h & 0xFFFFFFFF) | 1
+        return [row * self.width + (h1 + row * h2) % self.width for row in range(self.depth)]
+
+    def add(self, item, count=1):
+        cells = self._cells(item)
+        for cell in cells:
+            self.counters[cell] += count
+        self.total += count
+        self._offer(item, min(self.counters[cell] for cell in cells))
+
+    def _offer(self, item, estimate):
+        if item in self.candidates or len(self.candidates) < self.k:
+            self.candidates[item] = estimate
+            return
+        smallest = min(self.candidates, key=self.candidates.get)
+        if estimate > self.candidates[smallest]:
+            del self.candidates[smallest]
+            self.candidates[item] = estimate
+
+    def estimate(self, item):
+        return min(self.counters[cell] for cell in self._cells(item))
+
+    def merge(self, other):
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError("Cannot merge Count-Min sketches of different dimensions")
+        self.counters = [a + b for a, b in zip(self.counters, other.counters)]
+        self.total += other.total
+        items = set(self.candidates) | set(other.candidates)
+        self.candidates = {}
+        for item in sorted(items, key=self.estimate, reverse=True):
+            self._offer(item, self.estimate(item))
+
+    @property
+    def epsilon(self):
+        return math.e / self.width
+
+    @property
+    def delta(self):
+        return math.exp(-self.depth)
+
+    def top(self, n=None):
+        """
+        Heavy hitters as (item, estimated_count), largest first
+        """
+        ranked = sorted(self.candidates.items(), key=lambda item: item[1], reverse=True)
+        return ranked[:n] if n else ranked
+
+    def to_bytes(self):
+        header = struct.pack("<HHHQ", self.width, self.depth, self.k, self.total)
+        counters = struct.pack(f"<{len(self.counters)}I", *self.counters)
+        # Length-prefixed, since candidate names may contain any character
+        names = [item.encode("utf-8") for item in self.candidates]
+        candidates = b"".join(struct.pack("<H", len(name)) + name for name in names)
+        return header + counters + struct.pack("<I", len(names)) + candidates
+
+    @classmethod
+    def from_bytes(cls, data):
+        width, depth, k, total = struct.unpack_from("<HHHQ", data)
+        offset = struct.calcsize("<HHHQ")
+        counters = struct.unpack_from(f"<{width * depth}I", data, offset)
+        offset += 4 * width * depth
+        (count,) = struct.unpack_from("<I", data, offset)
+        offset += 4
+        sketch = cls(width, depth, k, counters)
+        sketch.total = total
+        for _ in range(count):
+            (length,) = struct.unpack_from("<H", data, offset)
+            item = data[offset + 2:offset + 2 + length].decode("utf-8")
+            offset += 2 + length
+            sketch.candidates[item] = sketch.estimate(item)
+        return sketch
+
+
+class TDigest:
+    """
+    Merging t-digest for quantiles of a bounded stream of floats
+    """
+
+    def __init__(self, compression=TDIGEST_COMPRESSION, centroids=None):
+        self.compression = compression
+        self.centroids = list(centroids or [])  # (mean, weight), sorted by mean
+        self._buffer = []
+
+    @property
+    def count(self):
+        self._flush()
+        return sum(weight for _, weight in self.centroids)
+
+    def add(self, value, weight=1):
+        self._buffer.append((float(value), weight))
+        if len(self._buffer) >= self.compression * 5:
+            self._flush()
+
+    def merge(self, other):
+        other._flush()
+        self._buffer.extend(other.centroids)
+        self._flush()
+
+    def _flush(self):
+        if not self._buffer:
+            return
+        points = sorted(self.centroids + self._buffer)
+        self._buffer = []
+        total = sum(weight for _, weight in points)
+
+        merged = []
+        cumulative = 0
+        mean, weight = points[0]
+        for next_mean, next_weight in points[1:]:
+            q = (cumulative + (weight + next_weight) / 2) / total
+            limit = max(1, 4 * total * q * (1 - q) / self.compression)
+            if weight + next_weight <= limit:
+                mean += (next_mean - mean) * next_weight / (weight + next_weight)
+                weight += next_weight
+            else:
+                merged.append((mean, weight))
+                cumulative += weight
+                mean, weight = next_mean, next_weight
+        merged.append((mean, weight))
+        self.centroids = merged
+
+    def quantile(self, q):
+        self._flush()
+        if not self.centroids:
+            return None
+        if len(self.centroids) == 1:
+            return self.centroids[0][0]
+
+        total = sum(weight for _, weight in self.centroids)
+        target = q * total
+        cumulative = 0
+        for i, (mean, weight) in enumerate(self.centroids):
+            center = cumulative + weight / 2
+            if target <= center:
+                if i == 0:
+                    return mean
+                prev_mean, prev_weight = self.centroids[i - 1]
+                prev_center = cumulative - prev_weight / 2
+                fraction = (target - prev_center) / (center - prev_center)
+                return prev_mean + fraction * (mean - prev_mean)
+            cumulative += weight
+        return self.centroids[-1][0]
+
+    def rank_error(self, q):
+        """
+        Bound on the rank error at q implied by the centroid size limit
+        """
+        return 2 * q * (1 - q) / self.compression
+
+    def to_bytes(self):
+        self._flush()
+        flat = [value for centroid in self.centroids for value in centroid]
+        return struct.pack(f"<HI{len(flat)}d", self.compression, len(self.centroids), *flat)
+
+    @classmethod
+    def from_bytes(cls, data):
+        compression, size = struct.unpack_from("<HI", data)
+        flat = struct.unpack_from(f"<{size * 2}d", data, struct.calcsize("<HI"))
+        return cls(compression, list(zip(flat[0::2], flat[1::2])))
+
+
+class SketchSet:
+    """
+    All sketches for one (scope, bucket): exact totals plus
+    disease heavy hitters, confidence digest and (globally) distinct grids
+    """
+
+    def __init__(self, with_grids=False):
+        self.total = 0
+        self.severity = {severity: 0 for severity in SEVERITIES}
+        self.diseases = CountMinTopK()
+        self.confidence = TDigest()
+        self.grids = HyperLogLog() if with_grids else None
+
+    def add(self, disease, severity, confidence, gps_grid=None):
+        self.total += 1
+        self.severity[severity] = self.severity.get(severity, 0) + 1
+        self.diseases.add(disease)
+        self.confidence.add(confidence)
+        if self.grids is not None and gps_grid:
+            self.grids.add(gps_grid)
+
+    def merge(self, other):
+        self.total += other.total
+        for severity, count in other.severity.items():
+            self.severity[severity] = self.severity.get(severity, 0) + count
+        self.diseases.merge(other.diseases)
+        self.confidence.merge(other.confidence)
+        if other.grids is not None:
+            if self.grids is None:
+                self.grids = HyperLogLog(other.grids.precision)
+            self.grids.merge(other.grids)
+        return self
+
+    def to_bytes(self):
+        parts = [
+            struct.pack(f"<Q{len(SEVERITIES)}Q", self.total, *(self.severity.get(s, 0) for s in SEVERITIES)),
+            self.diseases.to_bytes(),
+            self.confidence.to_bytes(),
+            self.grids.to_bytes() if self.grids is not None else b"",
+        ]
+        payload = b"".join(struct.pack("<I", len(part)) + part for part in parts)
+        return struct.pack("<B", _FORMAT_VERSION) + zlib.compress(payload)
+
+    @classmethod
+    def from_bytes(cls, data):
+        if data[0] != _FORMAT_VERSION:
+            raise ValueError(f"Unsupported sketch format version: {data[0]}")
+        payload = zlib.decompress(data[1:])
+        parts = []
+        offset = 0
+        while offset < len(payload):
+            (length,) = struct.unpack_from("<I", payload, offset)
+            parts.append(payload[offset + 4:offset + 4 + length])
+            offset += 4 + length
+
+        sketch = cls()
+        counts = struct.unpack(f"<Q{len(SEVERITIES)}Q", parts[0])
+        sketch.total = counts[0]
+        sketch.severity = dict(zip(SEVERITIES, counts[1:]))
+        sketch.diseases = CountMinTopK.from_bytes(parts[1])
+        sketch.confidence = TDigest.from_bytes(parts[2])
+        sketch.grids = HyperLogLog.from_bytes(parts[3]) if parts[3] else None
+        return sketch
+
+
+def time_bucket(timestamp):
+    """
+    Daily bucket for a scan timestamp (UTC)
+    """
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc)
+    return timestamp.date()
+
+
+def _fold(sketches, scan, bucket):
+    """
+    Add a scan to the global and grid sketches for bucket in
+    {(scope, bucket): SketchSet}
+    """
+    scopes = [GLOBAL_SCOPE] + ([scan.gps_grid] if scan.gps_grid else [])
+    for scope in scopes:
+        key = (scope, bucket)
+        if key not in sketches:
+            sketches[key] = SketchSet(with_grids=scope == GLOBAL_SCOPE)
+        sketches[key].add(scan.disease, scan.severity, scan.confidence, scan.gps_grid)
+
+
+def _add_rows(db: Session, sketches, is_delta):
+    """
+    Insert {(scope, bucket): SketchSet} as sketch rows in one statement
+    """
+    if not sketches:
+        return
+    db.execute(insert(ScanSketch), [
+        {
+            "scope": scope,
+            "bucket": bucket,
+            "is_delta": is_delta,
+            "total": sketch.total,
+            "data": sketch.to_bytes(),
+        }
+        for (scope, bucket), sketch in sketches.items()
+    ])
+
+
+def update_sketches(db: Session, scans):
+    """
+    Append delta sketches for newly ingested scans, one row per
+    (scope, day) touched; runs inside the caller's transaction
+    """
+    pending = {}
+    for scan in scans:
+        _fold(pending, scan, time_bucket(scan.timestamp))
+    _add_rows(db, pending, is_delta=True)
+
+
+def _compaction_lock(db: Session):
+    """
+    Take the compaction lock for this transaction (False if held elsewhere)
+    Only PostgreSQL has one; elsewhere compact_sketches relies on claiming rows
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return True
+    return db.execute(
+        text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": _COMPACTION_LOCK_KEY}
+    ).scalar()
+
+
+def compact_sketches(db: Session, batch_size: int = COMPACT_BATCH_SIZE):
+    """
+    Fold delta rows into one compacted row per (scope, bucket) and into
+    each scope's all-time rollup (bucket NULL)
+    Deltas are claimed by deleting them first, so a delta is folded by one
+    compaction only; returns the number of deltas folded
+    """
+    if not _compaction_lock(db):
+        return 0
+
+    deltas = db.query(ScanSketch.id, ScanSketch.scope, ScanSketch.bucket, ScanSketch.data).filter(
+        ScanSketch.is_delta.is_(True)
+    ).order_by(ScanSketch.id).limit(batch_size).all()
+
+    if not deltas:
+        return 0
+
+    # is_delta too: SQLite may reuse a folded delta's id for a compacted row
+    claimed = db.query(ScanSketch).filter(
+        ScanSketch.id.in_([delta.id for delta in deltas]),
+        ScanSketch.is_delta.is_(True)
+    ).delete(synchronize_session=False)
+    if claimed != len(deltas):
+        # A concurrent compaction folded some of these deltas first
+        db.rollback()
+        return 0
+
+    merged = {}
+    for delta in deltas:
+        sketch = SketchSet.from_bytes(delta.data)
+        merged.setdefault((delta.scope, delta.bucket), SketchSet()).merge(sketch)
+        merged.setdefault((delta.scope, None), SketchSet()).merge(sketch)  # Rollup
+
+    for (scope, bucket), sketch in merged.items():
+        row = db.query(ScanSketch).filter(
+            ScanSketch.scope == scope,
+            ScanSketch.bucket.is_(None) if bucket is None else ScanSketch.bucket == bucket,
+            ScanSketch.is_delta.is_(False)
+        ).first()
+
+        if row is None:
+            db.add(ScanSketch(
+                scope=scope,
+                bucket=bucket,
+                is_delta=False,
+                total=sketch.total,
+                data=sketch.to_bytes()
+            ))
+        else:
+            sketch.merge(SketchSet.from_bytes(row.data))
+            row.total = sketch.total
+            row.data = sketch.to_bytes()
+
+    db.commit()
+    return len(deltas)
+
+
+def run_compaction():
+    """
+    Compact all pending deltas in a fresh session
+    """
+    db = SessionLocal()
+    try:
+        compacted = 0
+        while True:
+            count = compact_sketches(db)
+            compacted += count
+            if count < COMPACT_BATCH_SIZE:
+                return compacted
+    finally:
+        db.close()
+
+
+async def compact_periodically(interval: float = COMPACT_INTERVAL_SECONDS):
+    """
+    Background loop compacting sketch deltas off the request path
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(run_compaction)
+        except Exception as e:
+            print(f"⚠ Sketch compaction failed: {str(e)}")
+
+
+def load_sketches(db: Session, scope=None, since: date = None):
+    """
+    Merge stored sketches, keyed by scope
+    Pass scope=GLOBAL_SCOPE for country-wide sketches; None loads every grid.
+    Without since, reads each scope's all-time rollup plus pending deltas;
+    with since, merges the daily rows from that day on
+    """
+    query = db.query(ScanSketch.scope, ScanSketch.data)
+    if scope is None:
+        query = query.filter(ScanSketch.scope != GLOBAL_SCOPE)
+    else:
+        query = query.filter(ScanSketch.scope == scope)
+    if since is None:
+        query = query.filter(ScanSketch.bucket.is_(None) | ScanSketch.is_delta.is_(True))
+    else:
+        query = query.filter(ScanSketch.bucket >= since)
+
+    merged = {}
+    for row_scope, data in query:
+        sketch = SketchSet.from_bytes(data)
+        if row_scope in merged:
+            merged[row_scope].merge(sketch)
+        else:
+            merged[row_scope] = sketch
+    return merged
+
+
+def window_start(days):
+    """
+    First daily bucket of a window covering the last `days` days (UTC)
+    None (no window) when days is not given
+    """
+    if days is None:
+        return None
+    return datetime.now(timezone.utc).date() - timedelta(days=days - 1)
+
+
+def count_bounds(sketch: CountMinTopK, estimate):
+    """
+    Interval holding the true count with probability 1 - delta
+    """
+    return {
+        "lower": max(0, math.floor(estimate - sketch.epsilon * sketch.total)),
+        "upper": estimate,
+    }
+
+
+def rebuild_sketches(db: Session, batch_size: int = 1000):
+    """
+    Recompute all sketches from the scans table as compacted rows
+    Scans are read in time order, so only the current day's sketches and
+    the all-time rollups are held in memory
+    Returns the number of scans folded in
+    """
+    db.query(ScanSketch).delete()
+
+    rows = db.query(
+        Scan.disease, Scan.severity, Scan.confidence, Scan.gps_grid, Scan.timestamp
+    ).order_by(Scan.timestamp, Scan.id).yield_per(batch_size)
+
+    rollups = {}
+    day_sketches = {}
+    day = None
+    written_days = set()
+    processed = 0
+
+    for scan in rows:
+        bucket = time_bucket(scan.timestamp)
+        if bucket != day:
+            _add_rows(db, day_sketches, is_delta=day in written_days)
+            written_days.add(day)
+            day_sketches = {}
+            day = bucket
+        _fold(day_sketches, scan, bucket)
+        _fold(rollups, scan, None)
+        processed += 1
+
+    # A day seen again (timestamps in mixed offsets) is left for compaction
+    _add_rows(db, day_sketches, is_delta=day in written_days)
+    _add_rows(db, rollups, is_delta=False)
+    db.commit()
+    return processed
+
+
+if __name__ == "__main__":
+    if "--compact" in sys.argv:
+        print(f"✓ Compacted {run_compaction()} sketch deltas")
+    else:
+        db = SessionLocal()
+        try:
+            count = rebuild_sketches(db)
+        finally:
+            db.close()
+        print(f"✓ Rebuilt sketches from {count} scans")
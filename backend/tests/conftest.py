@@ -0,0 +1,31 @@
+"""
+Test configuration - AgriShield AI
+Points the app at SQLite before any backend module is imported
+"""
+
+import os
+import sys
+
+os.environ["DATABASE_URL"] = "sqlite://"
+os.environ["DATABASE_READ_URLS"] = ""
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """
+    Session on a fresh SQLite primary with every table created
+    """
+    import database
+    import models  # noqa: F401
+
+    monkeypatch.setattr(database, "DATABASE_URL", f"sqlite:///{tmp_path / 'primary.db'}")
+    database.dispose_engines()
+    database.Base.metadata.create_all(database.get_engine())
+    session = database.SessionLocal()
+    yield session
+    session.close()
+    database.dispose_engines()
@@ -0,0 +1,116 @@
+"""
+Outbreak detection tests
+"""
+
+import itertools
+from datetime import datetime, timezone
+
+from database import SessionLocal
+from models import ActiveOutbreak, Scan
+from alerts import MemoryBroker, OutbreakDetector, seed_outbreaks
+
+GRID = "G_19.05_72.85"
+BLIGHT = "Tomato___Late_blight"
+
+_OTHER_DISEASES = itertools.count()
+
+
+class RecordingBroker(MemoryBroker):
+    def __init__(self):
+        super().__init__()
+        self.published = []
+
+    def publish(self, events):
+        self.published.extend(events)
+
+
+def _add_scans(db, disease, count, gps_grid=GRID):
+    db.add_all([
+        Scan(disease=disease, confidence=0.9, severity="high", gps_grid=gps_grid, timestamp=datetime.now(timezone.utc))
+        for _ in range(count)
+    ])
+    db.commit()
+
+
+def _types(events):
+    return [(event["type"], event["gps_grid"], event["disease"], event["severity"]) for event in events]
+
+
+def _add_other_scans(db, count):
+    # Each with a new disease, so none of them crosses the threshold
+    for _ in range(count):
+        _add_scans(db, f"Other_{next(_OTHER_DISEASES)}", 1)
+
+
+def test_outbreak_started_escalated_and_resolved(db):
+    broker = RecordingBroker()
+    detector = OutbreakDetector(broker)
+
+    _add_scans(db, BLIGHT, 2)
+    _add_other_scans(db, 3)
+    assert _types(detector.evaluate(db, {GRID})) == [("outbreak.started", GRID, BLIGHT, "medium")]
+
+    # Same severity: state is refreshed without an event
+    _add_scans(db, BLIGHT, 1)
+    _add_other_scans(db, 1)
+    assert detector.evaluate(db, {GRID}) == []
+    assert db.query(ActiveOutbreak).one().count == 3
+
+    _add_scans(db, BLIGHT, 10)
+    events = detector.evaluate(db, {GRID})
+    assert _types(events) == [("outbreak.escalated", GRID, BLIGHT, "critical")]
+    assert events[0]["previous_severity"] == "medium"
+
+    _add_other_scans(db, 30)
+    events = detector.evaluate(db, {GRID})
+    assert _types(events) == [("outbreak.resolved", GRID, BLIGHT, None)]
+    assert events[0]["previous_severity"] == "critical"
+    assert db.query(ActiveOutbreak).count() == 0
+
+    assert len(broker.published) == 3
+
+
+def test_only_touched_grids_are_evaluated(db):
+    detector = OutbreakDetector(RecordingBroker())
+    _add_scans(db, BLIGHT, 3, gps_grid="G_-33.90_18.40")
+    _add_scans(db, BLIGHT, 3)
+
+    assert _types(detector.evaluate(db, {GRID})) == [("outbreak.started", GRID, BLIGHT, "critical")]
+    assert db.query(ActiveOutbreak.gps_grid).all() == [(GRID,)]
+
+
+def test_concurrent_start_is_retried_without_duplicate_events(db):
+    _add_scans(db, BLIGHT, 5)
+    other_broker = RecordingBroker()
+
+    class RacingDetector(OutbreakDetector):
+        raced = False
+
+        def _diff(self, db, gps_grids):
+            events = super()._diff(db, gps_grids)
+            if not self.raced:
+                # Another worker records the same new outbreak first
+                self.raced = True
+                other = SessionLocal()
+                try:
+                    OutbreakDetector(other_broker).evaluate(other, gps_grids)
+                finally:
+                    other.close()
+            return events
+
+    broker = RecordingBroker()
+    assert RacingDetector(broker).evaluate(db, {GRID}) == []
+    assert broker.published == []
+    assert _types(other_broker.published) == [("outbreak.started", GRID, BLIGHT, "critical")]
+    assert db.query(ActiveOutbreak).count() == 1
+
+
+def test_seeded_outbreaks_are_not_reported_as_started(db):
+    _add_scans(db, BLIGHT, 6)
+    _add_scans(db, "Tomato___healthy", 4)
+
+    assert seed_outbreaks(db) == 2
+    assert seed_outbreaks(db) == 0
+
+    _add_scans(db, BLIGHT, 1)
+    assert OutbreakDetector(RecordingBroker()).evaluate(db, {GRID}) == []
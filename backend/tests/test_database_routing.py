@@ -0,0 +1,124 @@
+"""
+Read replica routing tests
+Uses one SQLite file as the primary and two as replicas; every database
+holds a single scan whose disease names it, so a read shows where it went
+"""
+
+import os
+import socket
+import time
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+import database
+from database import Base, ReadSessionLocal, get_db, get_read_db, get_replica_pool
+from models import Scan
+
+
+def _scan(disease):
+    return Scan(disease=disease, confidence=0.9, severity="low", timestamp=datetime.now(timezone.utc))
+
+
+def _source(db):
+    """
+    Name of the database a session read from (its newest scan)
+    """
+    return db.query(Scan.disease).order_by(Scan.id.desc()).first()[0]
+
+
+def _name(engine):
+    return os.path.splitext(os.path.basename(engine.url.database))[0]
+
+
+@pytest.fixture
+def databases(tmp_path, monkeypatch):
+    urls = {name: f"sqlite:///{tmp_path / name}.db" for name in ("primary", "replica1", "replica2")}
+    for name, url in urls.items():
+        engine = create_engine(url)
+        Base.metadata.create_all(engine)
+        with Session(engine) as db:
+            db.add(_scan(name))
+            db.commit()
+        engine.dispose()
+
+    monkeypatch.setattr(database, "DATABASE_URL", urls["primary"])
+    monkeypatch.setattr(database, "DATABASE_READ_URLS", [urls["replica1"], urls["replica2"]])
+    database.dispose_engines()
+    yield urls
+    database.dispose_engines()
+
+
+def test_replicas_are_used_round_robin(databases):
+    pool = get_replica_pool()
+    assert [_name(pool.choose()) for _ in range(4)] == ["replica1", "replica2", "replica1", "replica2"]
+
+
+def test_replica_marked_down_is_skipped(databases):
+    pool = get_replica_pool()
+    pool.mark_down(pool.engines[0])
+    assert [_name(pool.choose()) for _ in range(3)] == ["replica2"] * 3
+
+
+def test_unreachable_replica_fails_health_check(databases, tmp_path, monkeypatch):
+    missing = f"sqlite:///{tmp_path / 'missing' / 'replica.db'}"
+    monkeypatch.setattr(database, "DATABASE_READ_URLS", [missing, databases["replica1"]])
+    database.dispose_engines()
+
+    pool = get_replica_pool()
+    assert not pool.is_healthy(pool.engines[0])
+    assert [_name(pool.choose()) for _ in range(3)] == ["replica1"] * 3
+
+
+def test_reads_fall_back_to_primary_when_all_replicas_are_down(databases):
+    pool = get_replica_pool()
+    for replica in pool.engines:
+        pool.mark_down(replica)
+    assert pool.choose() is None
+
+    with ReadSessionLocal() as db:
+        assert _source(db) == "primary"
+
+
+def test_reads_after_a_write_in_the_same_request_go_to_primary(databases):
+    app = FastAPI()
+
+    @app.post("/scans")
+    async def create_scan(db: Session = Depends(get_db), read_db: Session = Depends(get_read_db)):
+        before = _source(read_db)
+        db.add(_scan("written"))
+        db.commit()
+        return {"before": before, "after": _source(read_db)}
+
+    @app.get("/scans/latest")
+    async def latest_scan(read_db: Session = Depends(get_read_db)):
+        return {"source": _source(read_db)}
+
+    client = TestClient(app)
+
+    response = client.post("/scans").json()
+    assert response["before"] in ("replica1", "replica2")
+    assert response["after"] == "written"
+
+    # The next request has not written, so it reads from a replica again
+    assert client.get("/scans/latest").json()["source"] in ("replica1", "replica2")
+
+
+def test_replica_that_never_answers_fails_health_check_within_timeout(databases, monkeypatch):
+    # Accepts TCP connections but never speaks the PostgreSQL protocol
+    with socket.socket() as listener:
+        listener.bind(("127.0.0.1", 0))
+        listener.listen()
+        port = listener.getsockname()[1]
+        monkeypatch.setattr(database, "REPLICA_CONNECT_TIMEOUT", 2)
+        monkeypatch.setattr(database, "DATABASE_READ_URLS", [f"postgresql://user:pw@127.0.0.1:{port}/db"])
+        database.dispose_engines()
+
+        pool = get_replica_pool()
+        start = time.monotonic()
+        assert not pool.is_healthy(pool.engines[0])
+        assert time.monotonic() - start < 10
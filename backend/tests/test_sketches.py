@@ -0,0 +1,170 @@
+"""
+Approximate sketch tests
+"""
+
+import random
+from datetime import date, datetime, timezone
+
+from sqlalchemy import event
+
+from database import SessionLocal
+from models import Scan, ScanSketch
+from sketches import (
+    GLOBAL_SCOPE, CountMinTopK, HyperLogLog, SketchSet, TDigest,
+    compact_sketches, count_bounds, load_sketches, rebuild_sketches, update_sketches
+)
+
+# Skewed stream: a few heavy diseases over a long tail, names included
+# that a delimiter-based encoding would split
+DISEASES = ["Tomato___Late_blight", "Potato___Early_blight", "Rust\nLeaf", "Mildiou précoce 🍅"] + [
+    f"Rare_{i}" for i in range(200)
+]
+
+
+def _stream(count, seed=7):
+    rng = random.Random(seed)
+    return [
+        (rng.choices(DISEASES, weights=[40, 20, 10, 5] + [1] * 200)[0], rng.random(), f"G_{rng.randint(0, 4000)}")
+        for _ in range(count)
+    ]
+
+
+def _rank(values, x):
+    return sum(value <= x for value in values) / len(values)
+
+
+def test_hyperloglog_round_trip_merge_and_bounds():
+    grids = [grid for _, _, grid in _stream(20000)]
+    single, left, right = HyperLogLog(), HyperLogLog(), HyperLogLog()
+    for i, grid in enumerate(grids):
+        single.add(grid)
+        (left if i % 2 else right).add(grid)
+    left.merge(right)
+
+    assert left.registers == single.registers
+    assert HyperLogLog.from_bytes(single.to_bytes()).registers == single.registers
+
+    # The ±2 standard error interval reported by /api/stats?approx=true
+    true_count = len(set(grids))
+    estimate = single.estimate()
+    assert estimate * (1 - 2 * single.relative_error) <= true_count <= estimate * (1 + 2 * single.relative_error)
+
+
+def test_count_min_round_trip_keeps_arbitrary_names():
+    sketch = CountMinTopK()
+    for disease, _, _ in _stream(5000):
+        sketch.add(disease)
+
+    restored = CountMinTopK.from_bytes(sketch.to_bytes())
+    assert restored.counters == sketch.counters
+    assert restored.total == sketch.total
+    assert restored.candidates == {item: sketch.estimate(item) for item in sketch.candidates}
+    assert "Rust\nLeaf" in restored.candidates
+    assert "Mildiou précoce 🍅" in restored.candidates
+
+
+def test_count_min_merge_matches_single_stream_and_bounds_hold():
+    stream = _stream(20000)
+    single, left, right = CountMinTopK(), CountMinTopK(), CountMinTopK()
+    for i, (disease, _, _) in enumerate(stream):
+        single.add(disease)
+        (left if i % 2 else right).add(disease)
+    left.merge(right)
+
+    assert left.counters == single.counters
+    assert left.total == single.total
+    assert [item for item, _ in left.top(4)] == [item for item, _ in single.top(4)]
+
+    true_counts = {}
+    for disease, _, _ in stream:
+        true_counts[disease] = true_counts.get(disease, 0) + 1
+    for disease, true_count in true_counts.items():
+        bounds = count_bounds(single, single.estimate(disease))
+        assert bounds["lower"] <= true_count <= bounds["upper"]
+
+
+def test_tdigest_round_trip_merge_and_rank_error():
+    values = [confidence for _, confidence, _ in _stream(20000)]
+    single, merged = TDigest(), TDigest()
+    parts = [TDigest() for _ in range(4)]
+    for i, value in enumerate(values):
+        single.add(value)
+        parts[i % 4].add(value)
+    for part in parts:
+        merged.merge(part)
+
+    restored = TDigest.from_bytes(single.to_bytes())
+    assert restored.centroids == single.centroids
+    assert merged.count == single.count == len(values)
+
+    for q in (0.1, 0.5, 0.9, 0.99):
+        for digest in (single, merged):
+            assert abs(_rank(values, digest.quantile(q)) - q) <= digest.rank_error(q) + 1 / len(values)
+
+
+def test_sketch_set_merge_matches_single_stream():
+    stream = _stream(3000)
+    single, left, right = SketchSet(with_grids=True), SketchSet(with_grids=True), SketchSet(with_grids=True)
+    for i, (disease, confidence, grid) in enumerate(stream):
+        severity = ("low", "high")[i % 2]
+        single.add(disease, severity, confidence, grid)
+        (left if i % 3 else right).add(disease, severity, confidence, grid)
+
+    merged = SketchSet.from_bytes(SketchSet.from_bytes(left.to_bytes()).merge(right).to_bytes())
+    assert merged.total == single.total
+    assert merged.severity == single.severity
+    assert merged.diseases.counters == single.diseases.counters
+    assert merged.grids.registers == single.grids.registers
+    assert merged.confidence.count == single.confidence.count
+
+
+def _scans(count, gps_grid="G_19.05_72.85"):
+    return [
+        Scan(
+            disease="Tomato___Late_blight" if i % 3 else "Tomato___healthy",
+            confidence=0.5 + (i % 50) / 100,
+            severity="high",
+            gps_grid=gps_grid,
+            timestamp=datetime(2024, 6, 1 + i % 3, tzinfo=timezone.utc)
+        )
+        for i in range(count)
+    ]
+
+
+def test_concurrent_compactions_fold_each_delta_once(db):
+    update_sketches(db, _scans(5))
+    db.commit()
+
+    # Run a second compaction between this one reading the deltas and claiming them
+    @event.listens_for(db, "do_orm_execute")
+    def race(state):
+        if state.is_delete and not race.done:
+            race.done = True
+            other = SessionLocal()
+            try:
+                assert compact_sketches(other) > 0
+            finally:
+                other.close()
+    race.done = False
+
+    assert compact_sketches(db) == 0
+    assert load_sketches(db, GLOBAL_SCOPE)[GLOBAL_SCOPE].total == 5
+    assert db.query(ScanSketch).filter(ScanSketch.is_delta.is_(True)).count() == 0
+
+
+def test_rebuild_writes_compacted_day_rows_and_rollups(db):
+    db.add_all(_scans(30) + _scans(9, gps_grid="G_-33.90_18.40"))
+    db.commit()
+
+    assert rebuild_sketches(db) == 39
+    assert db.query(ScanSketch).filter(ScanSketch.is_delta.is_(True)).count() == 0
+    # One rollup per scope, one row per (scope, day)
+    assert db.query(ScanSketch).filter(ScanSketch.bucket.is_(None)).count() == 3
+    assert db.query(ScanSketch).filter(ScanSketch.bucket.isnot(None)).count() == 9
+
+    sketches = load_sketches(db)
+    assert {scope: sketch.total for scope, sketch in sketches.items()} == {
+        "G_19.05_72.85": 30, "G_-33.90_18.40": 9
+    }
+    assert load_sketches(db, GLOBAL_SCOPE)[GLOBAL_SCOPE].total == 39
+    assert load_sketches(db, GLOBAL_SCOPE, since=date(2024, 6, 3))[GLOBAL_SCOPE].total == 13
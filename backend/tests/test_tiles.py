@@ -0,0 +1,127 @@
+"""
+Tile cache and endpoint tests
+"""
+
+import os
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from models import Scan
+from routers import tiles as tiles_router
+from routers.tiles import accepts_gzip, etag_matches
+from tiles import TileCache, grid_columns, latlon_to_tile
+
+GRID = "G_19.05_72.85"
+
+
+def _add_scan(db, gps_grid=GRID):
+    db.add(Scan(
+        disease="Tomato___Late_blight", confidence=0.9, severity="high", gps_grid=gps_grid,
+        timestamp=datetime.now(timezone.utc), **grid_columns(gps_grid)
+    ))
+    db.commit()
+
+
+class RacingTileCache(TileCache):
+    """
+    Cache where a sync touching GRID lands right after the first tile write
+    """
+
+    def __init__(self, root):
+        super().__init__(root)
+        self.raced = False
+
+    def _write(self, path, data):
+        super()._write(path, data)
+        if path.endswith(".json.gz") and not self.raced:
+            self.raced = True
+            TileCache(self.root).invalidate_grids([GRID])
+
+
+def test_get_discards_tile_invalidated_while_building(db, tmp_path):
+    _add_scan(db)
+    x, y = latlon_to_tile(19.05, 72.85, 8)
+
+    cache = RacingTileCache(str(tmp_path))
+    cache.get(db, 8, x, y)
+    assert not os.path.exists(cache._path(8, x, y))
+
+    cache.get(db, 8, x, y)
+    assert os.path.exists(cache._path(8, x, y))
+
+
+def test_precompute_skips_tiles_invalidated_while_running(db, tmp_path):
+    _add_scan(db)
+    _add_scan(db, "G_-33.90_18.40")
+
+    cache = RacingTileCache(str(tmp_path))
+    assert cache.precompute(db, [4]) == 1
+    assert not os.path.exists(cache._path(4, *latlon_to_tile(19.05, 72.85, 4)))
+    assert os.path.exists(cache._path(4, *latlon_to_tile(-33.90, 18.40, 4)))
+
+
+def test_precompute_drops_tiles_that_lost_their_data(db, tmp_path):
+    cache = TileCache(str(tmp_path))
+    stale = cache._path(4, 0, 0)
+    cache._write(stale, b"stale")
+    _add_scan(db)
+
+    assert cache.precompute(db, [4]) == 1
+    assert not os.path.exists(stale)
+    assert os.path.exists(cache._path(4, *latlon_to_tile(19.05, 72.85, 4)))
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip", True),
+    ("gzip, deflate, br", True),
+    ("deflate, GZIP;q=0.5", True),
+    ("gzip;q=0", False),
+    ("gzip; q=0.0, deflate", False),
+    ("*", True),
+    ("*;q=0", False),
+    ("gzip;q=0, *", False),
+    ("br, *;q=0.1", True),
+    ("identity", False),
+    ("", False),
+])
+def test_accepts_gzip_honours_q_values(header, expected):
+    assert accepts_gzip(header) is expected
+
+
+@pytest.mark.parametrize("header, expected", [
+    ('"abc"', True),
+    ('"xyz", "abc"', True),
+    ('W/"abc"', True),
+    ("*", True),
+    ('"abc-gz"', False),
+    ('"ab"', False),
+    ("", False),
+])
+def test_etag_matches_parses_if_none_match(header, expected):
+    assert etag_matches(header, '"abc"') is expected
+
+
+def test_tile_etags_differ_per_content_coding(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(tiles_router.tile_cache, "root", str(tmp_path))
+    _add_scan(db)
+    app = FastAPI()
+    app.include_router(tiles_router.router)
+    client = TestClient(app)
+    url = "/api/tiles/8/{}/{}".format(*latlon_to_tile(19.05, 72.85, 8))
+
+    gzipped = client.get(url, headers={"Accept-Encoding": "gzip"})
+    identity = client.get(url, headers={"Accept-Encoding": "identity"})
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert "content-encoding" not in identity.headers
+    assert gzipped.headers["etag"] != identity.headers["etag"]
+
+    def revalidate(etag, accept_encoding):
+        return client.get(url, headers={"If-None-Match": etag, "Accept-Encoding": accept_encoding}).status_code
+
+    assert revalidate(gzipped.headers["etag"], "gzip") == 304
+    assert revalidate(gzipped.headers["etag"], "identity") == 200
+    assert revalidate(identity.headers["etag"], "identity") == 304
+    assert revalidate("*", "identity") == 304
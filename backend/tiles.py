@@ -0,0 +1,339 @@
+"""
+Disease Heatmap Tiles - AgriShield AI
+Per-disease scan counts for all GPS grid cells in a Web Mercator map tile
+(z/x/y, as used by slippy maps), precomputed and cached on disk
+
+Tiles are stored gzipped under TILE_CACHE_DIR/{z}/{x}/{y}.json.gz and
+invalidated only for the tiles containing grids touched by a sync batch.
+Invalidation also rewrites a per-tile generation marker ({y}.gen), so a
+tile built from data read before the invalidation is not left cached.
+
+Tiles are built with a range query on the indexed grid_lat/grid_lon
+columns; tiles without data are served from one shared constant and never
+written to disk.
+
+Tile payload (compact JSON):
+    {"diseases": ["Tomato___Late_blight", ...],
+     "cells": [["G_19.05_72.85", 19.05, 72.85, total, [count per disease]], ...]}
+
+Precompute all tiles with data for the configured zoom levels with:
+    python tiles.py
+"""
+
+import gzip
+import hashlib
+import math
+import os
+import tempfile
+
+import orjson
+from sqlalchemy import func, inspect, text
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from models import Scan
+
+TILE_CACHE_DIR = os.getenv("TILE_CACHE_DIR", "tile_cache")
+TILE_MIN_ZOOM = int(os.getenv("TILE_MIN_ZOOM", "0"))
+TILE_MAX_ZOOM = int(os.getenv("TILE_MAX_ZOOM", "14"))
+
+MAX_LATITUDE = 85.0511287798  # Web Mercator limit
+
+
+def parse_grid(gps_grid):
+    """
+    (lat, lon) of a G_LAT_LON grid identifier, or None if malformed
+    """
+    parts = gps_grid.split("_") if gps_grid else []
+    if len(parts) != 3 or parts[0] != "G":
+        return None
+    try:
+        lat, lon = float(parts[1]), float(parts[2])
+    except ValueError:
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return None
+    return lat, lon
+
+
+def latlon_to_tile(lat, lon, z):
+    """
+    Tile (x, y) containing a coordinate at zoom z
+    """
+    n = 1 << z
+    lat = max(-MAX_LATITUDE, min(MAX_LATITUDE, lat))
+    x = int((lon + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def valid_tile(z, x, y):
+    return TILE_MIN_ZOOM <= z <= TILE_MAX_ZOOM and 0 <= x < (1 << z) and 0 <= y < (1 << z)
+
+
+def tile_bounds(z, x, y):
+    """
+    (south, west, north, east) in degrees of the coordinates in a tile,
+    including the polar latitudes clamped into the edge rows
+    """
+    n = 1 << z
+    west = x / n * 360.0 - 180.0
+    east = (x + 1) / n * 360.0 - 180.0
+    north = 90.0 if y == 0 else math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    south = -90.0 if y == n - 1 else math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return south, west, north, east
+
+
+def grid_columns(gps_grid):
+    """
+    Column values to set on a new Scan
+    """
+    coords = parse_grid(gps_grid)
+    if coords is None:
+        return {}
+    return {"grid_lat": coords[0], "grid_lon": coords[1]}
+
+
+def _encode_tile(grid_counts):
+    """
+    Gzipped tile payload from {gps_grid: {disease: count}}
+    """
+    diseases = sorted({disease for counts in grid_counts.values() for disease in counts})
+    index = {disease: i for i, disease in enumerate(diseases)}
+
+    cells = []
+    for gps_grid in sorted(grid_counts):
+        counts = grid_counts[gps_grid]
+        row = [0] * len(diseases)
+        for disease, count in counts.items():
+            row[index[disease]] = count
+        lat, lon = parse_grid(gps_grid)
+        cells.append([gps_grid, lat, lon, sum(row), row])
+
+    payload = orjson.dumps({"diseases": diseases, "cells": cells})
+    # mtime=0 keeps the bytes (and so the ETag) stable for identical content
+    return gzip.compress(payload, mtime=0)
+
+
+EMPTY_TILE = _encode_tile({})
+
+# Slack around tile bounds for float rounding; latlon_to_tile has the final say
+_BOUNDS_MARGIN = 1e-6
+
+
+def _grid_counts(db: Session, bounds=None):
+    """
+    {gps_grid: {disease: count}}, optionally restricted to grids with
+    coordinates within (south, west, north, east) bounds
+    """
+    query = db.query(Scan.gps_grid, Scan.disease, func.count(Scan.id)).filter(Scan.gps_grid.isnot(None))
+    if bounds is not None:
+        south, west, north, east = bounds
+        query = query.filter(
+            Scan.grid_lat.between(south - _BOUNDS_MARGIN, north + _BOUNDS_MARGIN),
+            Scan.grid_lon.between(west - _BOUNDS_MARGIN, east + _BOUNDS_MARGIN)
+        )
+
+    grid_counts = {}
+    for gps_grid, disease, count in query.group_by(Scan.gps_grid, Scan.disease):
+        if parse_grid(gps_grid) is not None:
+            grid_counts.setdefault(gps_grid, {})[disease] = count
+    return grid_counts
+
+
+def _remove(path):
+    """
+    Delete a file if present; returns whether it existed
+    """
+    try:
+        os.remove(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+class TileCache:
+    """
+    On-disk cache of gzipped tiles, one file per z/x/y
+    """
+
+    def __init__(self, root=TILE_CACHE_DIR):
+        self.root = root
+
+    def _path(self, z, x, y):
+        return os.path.join(self.root, str(z), str(x), f"{y}.json.gz")
+
+    def _marker_path(self, z, x, y):
+        return os.path.join(self.root, str(z), str(x), f"{y}.gen")
+
+    def _write(self, path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename, so readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as tmp:
+            tmp.write(data)
+        os.replace(tmp_path, path)
+
+    def _generation(self, z, x, y):
+        try:
+            with open(self._marker_path(z, x, y), "rb") as marker:
+                return marker.read()
+        except FileNotFoundError:
+            return None
+
+    def get(self, db: Session, z, x, y):
+        """
+        Gzipped tile bytes and ETag, built and cached on a miss
+        """
+        path = self._path(z, x, y)
+        try:
+            with open(path, "rb") as cached:
+                data = cached.read()
+        except FileNotFoundError:
+            generation = self._generation(z, x, y)
+            data = self.build(db, z, x, y)
+            # Empty tiles are not cached, so requests for them cannot fill the disk
+            if data is not EMPTY_TILE:
+                self._write(path, data)
+                if self._generation(z, x, y) != generation:
+                    # Invalidated while building: the tile may predate that sync
+                    _remove(path)
+        return data, f'"{hashlib.blake2b(data, digest_size=16).hexdigest()}"'
+
+    def build(self, db: Session, z, x, y):
+        """
+        Build one tile from the scans in its grid cells
+        Returns EMPTY_TILE when it has none
+        """
+        grid_counts = {
+            gps_grid: counts
+            for gps_grid, counts in _grid_counts(db, tile_bounds(z, x, y)).items()
+            if latlon_to_tile(*parse_grid(gps_grid), z) == (x, y)
+        }
+        return _encode_tile(grid_counts) if grid_counts else EMPTY_TILE
+
+    def _files(self, suffix, z=None):
+        """
+        Paths of cached files ending in suffix, optionally in one zoom level
+        """
+        top = self.root if z is None else os.path.join(self.root, str(z))
+        return {
+            os.path.join(dirpath, filename)
+            for dirpath, _, filenames in os.walk(top)
+            for filename in filenames
+            if filename.endswith(suffix)
+        }
+
+    def precompute(self, db: Session, zooms=None):
+        """
+        Write every tile containing data for the given zoom levels
+        Tiles invalidated by a sync while this runs are left uncached
+        Returns the number of tiles written
+        """
+        zooms = zooms if zooms is not None else range(TILE_MIN_ZOOM, TILE_MAX_ZOOM + 1)
+        # Generations are read before the scans, as in get
+        generations = {}
+        for path in self._files(".gen"):
+            with open(path, "rb") as marker:
+                generations[path] = marker.read()
+        grid_counts = _grid_counts(db)
+        written = 0
+
+        for z in zooms:
+            tiles = {}
+            for gps_grid, counts in grid_counts.items():
+                tile = latlon_to_tile(*parse_grid(gps_grid), z)
+                tiles.setdefault(tile, {})[gps_grid] = counts
+
+            lost_data = self._files(".json.gz", z)
+            for (x, y), tile_counts in tiles.items():
+                path = self._path(z, x, y)
+                lost_data.discard(path)
+                self._write(path, _encode_tile(tile_counts))
+                if self._generation(z, x, y) != generations.get(self._marker_path(z, x, y)):
+                    _remove(path)
+                else:
+                    written += 1
+
+            for path in lost_data:
+                _remove(path)
+
+        return written
+
+    def invalidate_grids(self, gps_grids):
+        """
+        Drop cached tiles containing any of the given grids, at every zoom
+        Returns the number of tiles removed
+        """
+        tiles = set()
+        for gps_grid in set(gps_grids):
+            coords = parse_grid(gps_grid)
+            if coords is None:
+                continue
+            for z in range(TILE_MIN_ZOOM, TILE_MAX_ZOOM + 1):
+                tiles.add((z, *latlon_to_tile(*coords, z)))
+
+        removed = 0
+        for z, x, y in tiles:
+            # New generation first, so builds already in flight discard their tile
+            self._write(self._marker_path(z, x, y), os.urandom(8))
+            removed += _remove(self._path(z, x, y))
+        return removed
+
+
+def ensure_grid_columns(conn):
+    """
+    Add the grid coordinate columns to an existing scans table
+    """
+    existing = {column["name"] for column in inspect(conn).get_columns(Scan.__tablename__)}
+    table = Scan.__table__
+    added = []
+
+    for name in ("grid_lat", "grid_lon"):
+        if name in existing:
+            continue
+        column_type = table.c[name].type.compile(dialect=conn.dialect)
+        conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {name} {column_type}"))
+        added.append(name)
+
+    for index in table.indexes:
+        if any(column.name in added for column in index.columns):
+            index.create(conn, checkfirst=True)
+
+    return added
+
+
+def backfill_grid_columns(db: Session):
+    """
+    Populate grid coordinates for rows ingested before the columns existed
+    Returns the number of grids updated
+    """
+    gps_grids = [
+        gps_grid
+        for (gps_grid,) in db.query(Scan.gps_grid).filter(
+            Scan.gps_grid.isnot(None),
+            Scan.grid_lat.is_(None)
+        ).distinct()
+    ]
+
+    updated = 0
+    for gps_grid in gps_grids:
+        columns = grid_columns(gps_grid)
+        if columns:
+            db.query(Scan).filter(Scan.gps_grid == gps_grid).update(columns, synchronize_session=False)
+            updated += 1
+
+    db.commit()
+    return updated
+
+
+tile_cache = TileCache()
+
+
+if __name__ == "__main__":
+    db = SessionLocal()
+    try:
+        count = tile_cache.precompute(db)
+    finally:
+        db.close()
+    print(f"✓ Precomputed {count} tiles (zoom {TILE_MIN_ZOOM}-{TILE_MAX_ZOOM}) in {TILE_CACHE_DIR}")